@@ -0,0 +1,152 @@
+import bisect
+import threading
+import time
+
+class EventAssociator:
+    def __init__(self, max_propagation_delay=1.0, max_lateness=2.0, min_sensors=3, max_pending=10000,
+                 max_skew=10.0):
+        """
+        Sensör raporlarını zamana göre sıralı kayan pencerede aynı atışa ait gruplara ayırır
+        
+        Bir grubun ilk ve son raporu arasındaki fark en fazla max_propagation_delay
+        olabilir. Filigran (watermark) ilerledikçe artık rapor alamayacak gruplar
+        kapatılır ve bellekten çıkarılır; böylece bellek kullanımı sabit kalır.
+        Filigran sensör saatlerinden ilerlediği için sunucu saatinin max_skew
+        saniyeden fazla ilerisinde zaman damgası taşıyan raporlar reddedilir.
+        
+        Args:
+            max_propagation_delay: Ses dalgasının dizi boyunca en uzun yayılma süresi (saniye)
+            max_lateness: Bir raporun ağ gecikmesi nedeniyle en fazla ne kadar geç gelebileceği (saniye)
+            min_sensors: Bir grubun konum hesabına gönderilmesi için gereken en az sensör sayısı
+            max_pending: Bellekte tutulacak en fazla açık grup sayısı
+            max_skew: Sensör saatinin sunucu saatinden en fazla ne kadar ileride olabileceği (saniye)
+        """
+        self.max_propagation_delay = max_propagation_delay
+        self.max_lateness = max_lateness
+        self.min_sensors = min_sensors
+        self.max_pending = max_pending
+        self.max_skew = max_skew
+        # Grup başlangıç zamanları (sıralı) ve aynı sıradaki gruplar
+        self.starts = []
+        self.groups = []
+        self.watermark = float('-inf')
+        self.dropped_groups = 0
+        self.late_reports = 0
+        self.rejected_reports = 0
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.groups)
+    
+    def add(self, report):
+        """
+        Raporu uygun gruba ekle
+        
+        Args:
+            report: {'sensor_id': str, 'timestamp': float, ...}
+        
+        Returns:
+            list: Filigran ilerlediği için kapanan gruplar (her biri rapor listesi)
+        """
+        timestamp = report['timestamp']
+        with self.lock:
+            if timestamp > time.time() + self.max_skew:
+                # Geleceğe tarihli rapor filigranı kalıcı olarak ileri taşımamalı
+                self.rejected_reports += 1
+                return []
+            if timestamp < self.watermark:
+                # Grubu zaten kapanmış bir rapor
+                self.late_reports += 1
+                return []
+            
+            group = self._find_group(report['sensor_id'], timestamp)
+            if group is None:
+                group = {
+                    'start': timestamp,
+                    'end': timestamp,
+                    'sensors': set(),
+                    'reports': []
+                }
+                index = bisect.bisect_right(self.starts, timestamp)
+                self.starts.insert(index, timestamp)
+                self.groups.insert(index, group)
+            elif timestamp < group['start']:
+                # Grubun başlangıcı değişti; sıralı konumunu güncelle
+                index = self._index_of(group)
+                del self.starts[index]
+                del self.groups[index]
+                group['start'] = timestamp
+                index = bisect.bisect_right(self.starts, timestamp)
+                self.starts.insert(index, timestamp)
+                self.groups.insert(index, group)
+            
+            group['end'] = max(group['end'], timestamp)
+            group['sensors'].add(report['sensor_id'])
+            group['reports'].append(report)
+            
+            completed = self._expire(timestamp - self.max_propagation_delay - self.max_lateness)
+            while len(self.groups) > self.max_pending:
+                # Bellek sınırı: en eski grubu erken kapat
+                completed.extend(self._pop_oldest())
+            return completed
+    
+    def advance(self, now):
+        """
+        Sunucu saatine göre filigranı ilerlet (yeni rapor gelmediğinde grupları kapatmak için)
+        
+        Args:
+            now: Şu anki zaman (epoch saniye)
+        
+        Returns:
+            list: Kapanan gruplar
+        """
+        with self.lock:
+            return self._expire(now - self.max_propagation_delay - self.max_lateness)
+    
+    def flush(self):
+        """Tüm açık grupları kapat (kapanış sırasında)"""
+        with self.lock:
+            completed = []
+            while self.groups:
+                completed.extend(self._pop_oldest())
+            return completed
+    
+    def _find_group(self, sensor_id, timestamp):
+        # Başlangıcı [t - gecikme, t + gecikme] aralığındaki gruplar aday
+        low = bisect.bisect_left(self.starts, timestamp - self.max_propagation_delay)
+        high = bisect.bisect_right(self.starts, timestamp + self.max_propagation_delay)
+        best = None
+        for group in self.groups[low:high]:
+            if sensor_id in group['sensors']:
+                continue
+            span = max(group['end'], timestamp) - min(group['start'], timestamp)
+            if span > self.max_propagation_delay:
+                continue
+            if best is None or abs(group['start'] - timestamp) < abs(best['start'] - timestamp):
+                best = group
+        return best
+    
+    def _index_of(self, group):
+        index = bisect.bisect_left(self.starts, group['start'])
+        while self.groups[index] is not group:
+            index += 1
+        return index
+    
+    def _expire(self, watermark):
+        if watermark <= self.watermark:
+            return []
+        self.watermark = watermark
+        # Başlangıcı filigrandan önce olan gruplar artık rapor alamaz
+        count = bisect.bisect_left(self.starts, watermark)
+        completed = []
+        for _ in range(count):
+            completed.extend(self._pop_oldest())
+        return completed
+    
+    def _pop_oldest(self):
+        del self.starts[0]
+        group = self.groups.pop(0)
+        if len(group['sensors']) < self.min_sensors:
+            self.dropped_groups += 1
+            return []
+        return [group['reports']]
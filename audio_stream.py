@@ -0,0 +1,190 @@
+import numpy as np
+import librosa
+import scipy.fft
+from collections import deque
+
+# extract_features spektral öznitelikleri sr vermeden, librosa'nın varsayılan
+# örnekleme hızıyla hesaplar; model bu frekans ölçeğiyle eğitildiğinden akışlı
+# hesapta da aynı eksen kullanılır
+SPECTRAL_SAMPLE_RATE = 22050
+
+class RingBuffer:
+    def __init__(self, capacity, channels=1):
+        """
+        Önceden ayrılmış (örnek, kanal) biçiminde float32 halka arabellek
+        
+        Her örnek iki kez yazılır (i ve i + capacity konumlarına); böylece
+        son örnekler her zaman bitişik bir görünüm olarak kopyalanmadan
+        okunabilir.
+        """
+        self.capacity = capacity
+        self.channels = channels
+        self.data = np.zeros((2 * capacity, channels), dtype=np.float32)
+        self.position = 0
+        self.count = 0
+    
+    def __len__(self):
+        return self.count
+    
+    def write(self, block):
+        block = np.asarray(block, dtype=np.float32).reshape(-1, self.channels)[-self.capacity:]
+        size = len(block)
+        first = min(size, self.capacity - self.position)
+        rest = size - first
+        self.data[self.position:self.position + first] = block[:first]
+        self.data[self.position + self.capacity:self.position + self.capacity + first] = block[:first]
+        if rest:
+            self.data[:rest] = block[first:]
+            self.data[self.capacity:self.capacity + rest] = block[first:]
+        self.position = (self.position + size) % self.capacity
+        self.count = min(self.count + size, self.capacity)
+    
+    def window(self, length=None):
+        """Son length örneğin (varsayılan: tüm içerik) salt okunur (örnek, kanal) görünümü"""
+        length = self.count if length is None else min(length, self.count)
+        end = self.position + self.capacity
+        view = self.data[end - length:end]
+        view.flags.writeable = False
+        return view
+    
+    def clear(self):
+        self.position = 0
+        self.count = 0
+
+class StreamingFeatureExtractor:
+    def __init__(self, sample_rate, window_size, channels=1, n_fft=2048, hop_length=512, n_mfcc=13,
+                 n_mels=128, roll_percent=0.85):
+        """
+        AcousticSensor.extract_features özniteliklerinin akışlı hesabı
+        
+        Her blokta yalnızca yeni tamamlanan STFT kareleri hesaplanır; kare
+        başına spektral öznitelikler ve MFCC'ler son n_frames kareyi tutan
+        halkalarda saklanır, MFCC ortalaması ve zaman alanı istatistikleri
+        eklenen/çıkan değerlerle güncellenir. Tüm kanallar tek NumPy
+        işlemiyle birlikte hesaplanır.
+        
+        Args:
+            sample_rate: Örnekleme hızı (Hz)
+            window_size: Özniteliklerin kapsadığı pencere uzunluğu (örnek)
+            channels: Kanal sayısı; bloklar (örnek, kanal) biçiminde verilir
+            n_fft, hop_length: STFT kare uzunluğu ve kaydırma miktarı
+            n_mfcc, n_mels: MFCC ve mel bandı sayıları
+            roll_percent: Spektral rolloff enerji oranı
+        """
+        self.sample_rate = sample_rate
+        self.window_size = window_size
+        self.channels = channels
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.roll_percent = roll_percent
+        # librosa.stft(center=True) ile aynı kare sayısı
+        self.n_frames = 1 + window_size // hop_length
+        self.fft_window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        self.frequencies = np.fft.rfftfreq(n_fft, 1.0 / SPECTRAL_SAMPLE_RATE)
+        self.mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=n_mels).astype(np.float32)
+        self.dct_basis = scipy.fft.dct(np.eye(n_mels), type=2, norm='ortho', axis=0)[:n_mfcc].astype(np.float32)
+        
+        self.centroid = np.zeros((self.n_frames, channels))
+        self.bandwidth = np.zeros((self.n_frames, channels))
+        self.rolloff = np.zeros((self.n_frames, channels))
+        self.mfccs = np.zeros((self.n_frames, channels, n_mfcc))
+        self.reset()
+    
+    def reset(self):
+        self.pending = np.zeros((0, self.channels), dtype=np.float32)
+        self.frame_position = 0
+        self.frame_count = 0
+        self.mfcc_sum = np.zeros(self.mfccs.shape[1:])
+        # Blok başına (örnek sayısı, kanal başına kareler toplamı ve sıfır geçişi)
+        self.blocks = deque()
+        self.block_samples = 0
+        self.sum_squares = np.zeros(self.channels)
+        self.zero_crossings = np.zeros(self.channels, dtype=np.int64)
+        self.last_sign = None
+        self.last_magnitude = None
+    
+    def update(self, block):
+        """
+        Yeni ses bloğunu işle
+        
+        Returns:
+            Bu blokta tamamlanan karelerin genlik spektrumları (kare, kanal, frekans)
+        """
+        block = np.asarray(block, dtype=np.float32).reshape(-1, self.channels)
+        self.update_time_domain(block)
+        
+        samples = np.concatenate([self.pending, block])
+        n_new = (len(samples) - self.n_fft) // self.hop_length + 1 if len(samples) >= self.n_fft else 0
+        if n_new <= 0:
+            self.pending = samples
+            return np.zeros((0, self.channels, len(self.frequencies)), dtype=np.float32)
+        frames = np.lib.stride_tricks.sliding_window_view(samples, self.n_fft, axis=0)[::self.hop_length][:n_new]
+        self.pending = samples[n_new * self.hop_length:]
+        magnitude = np.abs(np.fft.rfft(frames * self.fft_window, axis=-1)).astype(np.float32)
+        self.add_frames(magnitude[-self.n_frames:])
+        self.last_magnitude = magnitude[-1]
+        return magnitude
+    
+    def update_time_domain(self, block):
+        signs = np.signbit(block)
+        zero_crossings = np.count_nonzero(signs[1:] != signs[:-1], axis=0)
+        if self.last_sign is not None and len(block):
+            zero_crossings += signs[0] != self.last_sign
+        if len(block):
+            self.last_sign = signs[-1]
+        sum_squares = np.einsum('ij,ij->j', block, block, dtype=np.float64)
+        self.blocks.append((len(block), sum_squares, zero_crossings))
+        self.block_samples += len(block)
+        self.sum_squares += sum_squares
+        self.zero_crossings += zero_crossings
+        # Pencereyi aşan eski bloklar çıkarılır
+        while self.block_samples - self.blocks[0][0] >= self.window_size:
+            size, sum_squares, zero_crossings = self.blocks.popleft()
+            self.block_samples -= size
+            self.sum_squares -= sum_squares
+            self.zero_crossings -= zero_crossings
+    
+    def add_frames(self, magnitude):
+        # magnitude: (kare, kanal, frekans)
+        total = magnitude.sum(axis=-1)
+        safe_total = np.maximum(total, 1e-10)
+        centroid = magnitude @ self.frequencies / safe_total
+        deviation = (self.frequencies - centroid[..., None]) ** 2
+        bandwidth = np.sqrt((magnitude * deviation).sum(axis=-1) / safe_total)
+        cumulative = np.cumsum(magnitude, axis=-1)
+        rolloff = self.frequencies[np.argmax(cumulative >= self.roll_percent * total[..., None], axis=-1)]
+        mel = (magnitude ** 2) @ self.mel_basis.T
+        mfccs = (10.0 * np.log10(np.maximum(mel, 1e-10))) @ self.dct_basis.T
+        
+        for index in range(len(magnitude)):
+            position = self.frame_position
+            if self.frame_count == self.n_frames:
+                self.mfcc_sum -= self.mfccs[position]
+            else:
+                self.frame_count += 1
+            self.centroid[position] = centroid[index]
+            self.bandwidth[position] = bandwidth[index]
+            self.rolloff[position] = rolloff[index]
+            self.mfccs[position] = mfccs[index]
+            self.mfcc_sum += mfccs[index]
+            self.frame_position = (position + 1) % self.n_frames
+    
+    def ordered(self, values):
+        # Halkadaki kareleri eskiden yeniye sırala
+        if self.frame_count < self.n_frames:
+            return values[:self.frame_count].copy()
+        return np.roll(values, -self.frame_position, axis=0)
+    
+    def features(self):
+        """
+        extract_features ile aynı anahtarlara sahip öznitelik sözlüğü; her
+        değerin ilk ekseni kanaldır
+        """
+        return {
+            'rms': np.sqrt(np.maximum(self.sum_squares, 0.0) / max(self.block_samples, 1)),
+            'zero_crossing_rate': self.zero_crossings.copy(),
+            'spectral_centroid': self.ordered(self.centroid).T,
+            'spectral_bandwidth': self.ordered(self.bandwidth).T,
+            'spectral_rolloff': self.ordered(self.rolloff).T,
+            'mfccs': self.mfcc_sum / max(self.frame_count, 1)
+        }
@@ -1,24 +1,124 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import numpy as np
 from triangulation import calculate_source_location
 from notification import send_alert
-from database import store_event, get_events
+from database import store_event, flush_events, ensure_indexes, find_events, encode_cursor, decode_cursor
+from association import EventAssociator
+from frames import decode_batch, decode_snippet_payload
+from spatial import parse_area
+from heatmap import HeatmapAggregator
+from gcc_phat import refine_arrival_times
+import metrics
 import time
 from datetime import datetime, timedelta
 import logging
 from geopy.distance import geodesic
 import threading
 import queue
+import base64
+import json
+from concurrent.futures import ProcessPoolExecutor
 
 app = Flask(__name__)
 
+REPORTS_RECEIVED = metrics.counter('gunshot_reports_received_total', 'Alınan sensör raporları')
+INGEST_REJECTED = metrics.counter('gunshot_ingest_rejected_total', 'Kuyruk dolu veya işleyici durduğu için reddedilen istekler')
+GROUPS_DROPPED = metrics.counter('gunshot_groups_dropped_total', 'Kuyruk dolu olduğu için atılan gruplar')
+PROCESSING_ERRORS = metrics.counter('gunshot_processing_errors_total', 'Konum hesabı veya kayıt sırasında hata veren gruplar')
+EVENTS_STORED = metrics.counter('gunshot_events_stored_total', 'Kaydedilen olaylar')
+ALERTS_SENT = metrics.counter('gunshot_alerts_sent_total', 'Gönderilen uyarılar')
+ALERTS_FAILED = metrics.counter('gunshot_alerts_failed_total', 'Gönderilemeyen uyarılar')
+ASSOCIATOR_DROPPED = metrics.counter('gunshot_associator_dropped_groups_total', 'Yetersiz sensörle kapanan gruplar')
+ASSOCIATOR_LATE = metrics.counter('gunshot_associator_late_reports_total', 'Grubu kapandıktan sonra gelen raporlar')
+ASSOCIATOR_REJECTED = metrics.counter('gunshot_associator_rejected_reports_total', 'Sunucu saatinin çok ilerisine tarihli reddedilen raporlar')
+EVENT_BUFFER_GROUPS = metrics.gauge('gunshot_event_buffer_groups', 'Eşleştiricide açık grup sayısı')
+EVENT_QUEUE_DEPTH = metrics.gauge('gunshot_event_queue_depth', 'Konum hesabını bekleyen grup sayısı')
+RESULT_QUEUE_DEPTH = metrics.gauge('gunshot_result_queue_depth', 'Süreç havuzunda sonucu beklenen grup sayısı')
+INGEST_SECONDS = metrics.histogram('gunshot_ingest_seconds', 'Rapor alma isteğinin işlenme süresi')
+LOCALIZATION_SECONDS = metrics.histogram('gunshot_localization_seconds', 'Konum hesabı süresi (havuzda bekleme dahil)')
+STORE_SECONDS = metrics.histogram('gunshot_store_event_seconds', 'store_event süresi')
+ALERT_SECONDS = metrics.histogram('gunshot_send_alert_seconds', 'send_alert süresi')
+
+# GCC-PHAT'ın ihtiyaç duyduğu rapor alanları; işçilere yalnızca bunlar gönderilir
+REFINEMENT_FIELDS = ('timestamp', 'audio_data', 'sample_rate', 'onset_index')
+
+def calculate_time_differences(sensor_data):
+    # Ses kesitleri varsa varış zamanları GCC-PHAT ile iyileştirilir
+    arrivals = None
+    try:
+        arrivals = refine_arrival_times(sensor_data)
+    except Exception as e:
+        logging.error(f"GCC-PHAT refinement failed: {str(e)}")
+    if arrivals is None:
+        arrivals = [data['timestamp'] for data in sensor_data]
+    base_time = min(arrivals)
+    return np.array([arrival - base_time for arrival in arrivals], dtype=float)
+
+def localize_group(sensor_locations, reports):
+    """
+    Varış zamanlarını iyileştirip kaynağın konumunu hesapla; süreç havuzunda
+    çalışabilmesi için modül düzeyindedir
+    
+    Args:
+        sensor_locations: (sensör, 2) dizisi [(lat, lon), ...]
+        reports: REFINEMENT_FIELDS alanlarını içeren sensör raporları
+    """
+    return calculate_source_location(sensor_locations, calculate_time_differences(reports))
+
 class GunShotDetectionServer:
-    def __init__(self):
+    def __init__(self, max_propagation_delay=1.0, max_lateness=2.0, async_ingestion=False,
+                 max_queue_size=1000, retry_after=1, localization_workers=0):
+        """
+        Args:
+            max_propagation_delay: Aynı atışa ait raporlar arasındaki en büyük süre (saniye)
+            max_lateness: Raporların ağ gecikmesi için tanınan süre (saniye)
+            async_ingestion: True ise /api/event raporu hemen onaylar; tamamlanan
+                gruplar sınırlı kuyruğa alınır ve konum hesabı arka planda yapılır
+            max_queue_size: Konum hesabını bekleyen en fazla grup sayısı
+            retry_after: Kuyruk dolu olduğunda sensörlere önerilen bekleme süresi (saniye)
+            localization_workers: 0'dan büyükse konum hesabı bu sayıda süreçten
+                oluşan havuzda yapılır; sonuçlar gönderim sırasıyla kaydedilir
+        """
         self.active_sensors = {}
-        self.event_buffer = {}
-        self.event_queue = queue.Queue()
+        # Aynı atışa ait raporları zaman penceresinde gruplayan, bellek sınırlı dizin
+        self.event_buffer = EventAssociator(
+            max_propagation_delay=max_propagation_delay,
+            max_lateness=max_lateness
+        )
+        self.event_queue = queue.Queue(maxsize=max_queue_size)
+        self.async_ingestion = async_ingestion
+        self.retry_after = retry_after
+        self.dropped_groups = 0
+        self.localization_workers = localization_workers
+        self.executor = None
+        # Kapanışta yeni rapor kabul edilmez; işleyiciler kuyruklar boşalınca durur
+        self.stopping = threading.Event()
+        # Isı haritası için hücre/saat başına olay sayaçları
+        self.heatmap = HeatmapAggregator()
         self.setup_logging()
+        self.setup_metrics()
+        ensure_indexes()
+        self.load_heatmap()
         self.start_event_processor()
+        self.register_routes()
+    
+    def register_routes(self):
+        app.add_url_rule('/api/events', view_func=self.get_recent_events, methods=['GET'])
+        app.add_url_rule('/api/event', view_func=self.receive_event, methods=['POST'])
+        app.add_url_rule('/api/events/batch', view_func=self.receive_event_batch, methods=['POST'])
+        app.add_url_rule('/api/heatmap', view_func=self.get_heatmap, methods=['GET'])
+        app.add_url_rule('/metrics', view_func=self.get_metrics, methods=['GET'])
+    
+    def setup_metrics(self):
+        # Kuyruk ve tampon boyutları yalnızca okuma anında hesaplanır
+        EVENT_BUFFER_GROUPS.set_function(lambda: len(self.event_buffer))
+        EVENT_QUEUE_DEPTH.set_function(self.event_queue.qsize)
+        RESULT_QUEUE_DEPTH.set_function(
+            lambda: self.result_queue.qsize() if self.executor is not None else 0
+        )
+        ASSOCIATOR_DROPPED.set_function(lambda: self.event_buffer.dropped_groups)
+        ASSOCIATOR_LATE.set_function(lambda: self.event_buffer.late_reports)
+        ASSOCIATOR_REJECTED.set_function(lambda: self.event_buffer.rejected_reports)
         
     def setup_logging(self):
         logging.basicConfig(
@@ -26,8 +126,24 @@ class GunShotDetectionServer:
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
+    
+    def load_heatmap(self):
+        try:
+            since = datetime.fromtimestamp(time.time() - self.heatmap.retention)
+            count = self.heatmap.load(find_events(since, fields='summary'))
+            logging.info(f"Heatmap loaded from {count} stored events")
+        except Exception as e:
+            logging.error(f"Error loading heatmap: {str(e)}")
         
     def start_event_processor(self):
+        if self.localization_workers > 0:
+            self.executor = ProcessPoolExecutor(max_workers=self.localization_workers)
+            # Havuzda aynı anda en fazla 2 x işçi sayısı kadar grup bulunur
+            self.result_queue = queue.Queue(maxsize=2 * self.localization_workers)
+            self.result_thread = threading.Thread(target=self.process_result_queue)
+            self.result_thread.daemon = True
+            self.result_thread.start()
+        
         self.processor_thread = threading.Thread(target=self.process_event_queue)
         self.processor_thread.daemon = True
         self.processor_thread.start()
@@ -36,11 +152,77 @@ class GunShotDetectionServer:
         while True:
             try:
                 event_key = self.event_queue.get(timeout=1.0)
+                if event_key is None:
+                    # Kapanış işareti; önceki gruplar işlendi, sonuç iş parçacığı da dursun
+                    if self.executor is not None:
+                        self.result_queue.put(None)
+                    return
                 self.process_event_group(event_key)
             except queue.Empty:
-                continue
+                # Yeni rapor gelmese de süresi dolan grupları kapat
+                for group in self.event_buffer.advance(time.time()):
+                    self.enqueue_group(group)
+            except Exception as e:
+                PROCESSING_ERRORS.inc()
+                logging.error(f"Error processing event: {str(e)}")
+    
+    def enqueue_group(self, sensor_data):
+        try:
+            self.event_queue.put(sensor_data, timeout=0.1)
+            return True
+        except queue.Full:
+            self.dropped_groups += 1
+            GROUPS_DROPPED.inc()
+            logging.error(f"Event queue full, dropping group of {len(sensor_data)} reports")
+            return False
+    
+    def process_result_queue(self):
+        while True:
+            item = self.result_queue.get()
+            if item is None:
+                return
+            future, sensor_data, submitted = item
+            try:
+                location = future.result()
+                LOCALIZATION_SECONDS.observe(time.perf_counter() - submitted)
+                self.record_event(sensor_data, location)
+                self.notify_authorities(location)
             except Exception as e:
+                PROCESSING_ERRORS.inc()
                 logging.error(f"Error processing event: {str(e)}")
+    
+    def process_event_group(self, sensor_data):
+        if self.executor is not None:
+            # İşçilere konumlar ve GCC-PHAT için gereken kesit alanları gönderilir;
+            # ilinti hesabı da dağıtıcı iş parçacığında değil havuzda yapılır
+            sensor_locations, reports = self.compact_group(sensor_data)
+            submitted = time.perf_counter()
+            future = self.executor.submit(localize_group, sensor_locations, reports)
+            self.result_queue.put((future, sensor_data, submitted))
+            return
+        
+        location = self.process_event(sensor_data)
+        self.notify_authorities(location)
+    
+    def compact_group(self, sensor_data):
+        filtered_data = self.remove_outliers(sensor_data)
+        sensor_locations = np.array([data['gps'] for data in filtered_data], dtype=float)
+        reports = [{field: data.get(field) for field in REFINEMENT_FIELDS} for data in filtered_data]
+        for report in reports:
+            if report['audio_data'] is not None:
+                # JSON ile gelen örnek listeleri havuza dizi olarak (daha küçük) gönderilir
+                report['audio_data'] = np.asarray(report['audio_data'], dtype=np.float32)
+        return sensor_locations, reports
+    
+    def remove_outliers(self, sensor_data):
+        # Geçersiz GPS koordinatlı raporları çıkar, her sensörün ilk raporunu kullan
+        filtered_data = {}
+        for data in sorted(sensor_data, key=lambda data: data['timestamp']):
+            lat, lon = data['gps']
+            if not (-90 <= lat <= 90) or not (-180 <= lon <= 180):
+                continue
+            filtered_data.setdefault(data['sensor_id'], data)
+        return list(filtered_data.values())
                 
     def validate_sensor_data(self, sensor_data):
         # Validate GPS coordinates
@@ -56,55 +238,175 @@ class GunShotDetectionServer:
             
         return True
         
-    def calculate_time_differences(self, sensor_data):
-        base_time = min(data['timestamp'] for data in sensor_data)
-        return [data['timestamp'] - base_time for data in sensor_data]
-        
-    @app.route('/api/events', methods=['GET'])
     def get_recent_events(self):
         try:
             hours = int(request.args.get('hours', 24))
             since = datetime.now() - timedelta(hours=hours)
-            events = get_events(since)
-            return jsonify({'events': events})
+            fields = request.args.get('fields', 'summary')
+            if fields not in ('summary', 'full'):
+                return jsonify({'error': 'fields must be summary or full'}), 400
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            area = parse_area(request.args)
+            
+            if request.args.get('format') == 'ndjson':
+                # Sonuçlar veritabanından parça parça okunup satır satır gönderilir
+                events = find_events(since, fields=fields, after=after, area=area)
+                lines = (json.dumps(self.serialize_event(event)) + '\n' for event in events)
+                return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+            
+            limit = min(int(request.args.get('limit', 500)), 5000)
+            if limit < 1:
+                raise ValueError('limit must be positive')
+            events = list(find_events(since, fields=fields, after=after, limit=limit, area=area))
+            next_cursor = encode_cursor(events[-1]) if len(events) == limit else None
+            return jsonify({
+                'events': [self.serialize_event(event) for event in events],
+                'next_cursor': next_cursor
+            })
+        except ValueError:
+            return jsonify({'error': 'Invalid query parameters'}), 400
         except Exception as e:
             logging.error(f"Error retrieving events: {str(e)}")
             return jsonify({'error': 'Internal server error'}), 500
+    
+    def get_heatmap(self):
+        try:
+            end = float(request.args.get('end', time.time()))
+            start = float(request.args.get('start', end - float(request.args.get('hours', 24)) * 3600))
+            precision = int(request.args.get('precision', 6))
+            cells = self.heatmap.cells(start, end, precision, area=parse_area(request.args))
+            return jsonify({
+                'start': start,
+                'end': end,
+                'precision': precision,
+                'max_count': max((cell['count'] for cell in cells), default=0),
+                'cells': cells
+            })
+        except ValueError:
+            return jsonify({'error': 'Invalid query parameters'}), 400
+    
+    def serialize_event(self, value):
+        # ObjectId, datetime ve ikili ses verisini JSON uyumlu hale getir
+        if isinstance(value, dict):
+            return {key: self.serialize_event(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.serialize_event(item) for item in value]
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, bytes):
+            return base64.b64encode(value).decode('ascii')
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return value
+        return str(value)
         
-    @app.route('/api/event', methods=['POST'])
     def receive_event(self):
         event_data = request.json
-        sensor_id = event_data['sensor_id']
-        timestamp = event_data['timestamp']
+        if isinstance(event_data.get('audio_snippet'), str):
+            # Sıkıştırılmış ses kesiti JSON içinde base64 olarak gelir
+            try:
+                event_data.update(decode_snippet_payload(base64.b64decode(event_data['audio_snippet'])))
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        return self.ingest_reports([event_data])
         
-        # Aynı olay için diğer sensörlerden gelen verileri grupla
-        event_key = f"{timestamp:.1f}"
-        if event_key not in self.event_buffer:
-            self.event_buffer[event_key] = []
-        self.event_buffer[event_key].append(event_data)
+    def receive_event_batch(self):
+        # İkili çerçeveler; örnekler istek gövdesi üzerinde kopyasız görünüm olarak çözülür
+        try:
+            reports = decode_batch(request.get_data())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return self.ingest_reports(reports)
+    
+    def ingest_reports(self, reports):
+        REPORTS_RECEIVED.inc(len(reports))
+        with INGEST_SECONDS.time():
+            return self.ingest_reports_timed(reports)
+    
+    def ingest_reports_timed(self, reports):
+        if self.async_ingestion:
+            # Konum hesabı istek yolunun dışında; kuyruk doluysa sensör tekrar denesin
+            if self.stopping.is_set() or not self.processor_thread.is_alive():
+                INGEST_REJECTED.inc()
+                return self.retry_response(503)
+            if self.event_queue.full():
+                INGEST_REJECTED.inc()
+                return self.retry_response(429)
+            for event_data in reports:
+                for group in self.event_buffer.add(event_data):
+                    self.enqueue_group(group)
+            return {'status': 'accepted', 'received': len(reports)}, 202
         
-        # En az 3 sensörden veri geldiyse konumu hesapla
-        if len(self.event_buffer[event_key]) >= 3:
-            location = self.process_event(self.event_buffer[event_key])
-            self.notify_authorities(location)
+        # Aynı olay için diğer sensörlerden gelen verileri grupla;
+        # penceresi kapanan ve en az 3 sensör içeren grupların konumunu hesapla
+        for event_data in reports:
+            for group in self.event_buffer.add(event_data):
+                try:
+                    self.process_event_group(group)
+                except Exception as e:
+                    # Rapor kabul edildi; kapanan bir grubun hatası yanıtı etkilemez
+                    PROCESSING_ERRORS.inc()
+                    logging.error(f"Error processing event: {str(e)}")
             
-        return {'status': 'success'}
+        return {'status': 'success', 'received': len(reports)}
+    
+    def retry_response(self, status_code):
+        response = jsonify({'status': 'retry', 'retry_after': self.retry_after})
+        response.status_code = status_code
+        response.headers['Retry-After'] = str(self.retry_after)
+        return response
         
     def process_event(self, sensor_data):
-        # Aykırı değer tespiti eklenebilir
-        filtered_data = self.remove_outliers(sensor_data)
-        sensor_locations = [data['gps'] for data in filtered_data]
-        time_differences = self.calculate_time_differences(filtered_data)
-        source_location = calculate_source_location(sensor_locations, time_differences)
+        sensor_locations, reports = self.compact_group(sensor_data)
+        with LOCALIZATION_SECONDS.time():
+            source_location = localize_group(sensor_locations, reports)
+        self.record_event(sensor_data, source_location)
+        return source_location
         
+    def record_event(self, sensor_data, source_location):
         # Olayı veritabanına kaydet
-        store_event({
+        event = {
             'timestamp': sensor_data[0]['timestamp'],
             'location': source_location,
-            'sensor_data': sensor_data
-        })
+            'sensor_data': [self.storable_report(data) for data in sensor_data]
+        }
+        with STORE_SECONDS.time():
+            store_event(event)
+        EVENTS_STORED.inc()
+        self.heatmap.add(sensor_data[0]['timestamp'], *source_location)
+    
+    def storable_report(self, data):
+        # Sıkıştırılmış kesit varsa yalnızca o saklanır
+        if data.get('audio_snippet') is not None:
+            return {key: value for key, value in data.items() if key != 'audio_data'}
+        # İkili uçtan gelen örnekler NumPy görünümüdür; veritabanına ham bayt olarak yazılır
+        audio_data = data.get('audio_data')
+        if isinstance(audio_data, np.ndarray):
+            data = dict(data, audio_data=audio_data.astype('<f4').tobytes())
+        return data
         
-        return source_location
+    def shutdown(self, timeout=30.0):
+        """
+        Açık grupları kapatıp işle, kuyrukları boşalt, iş parçacıklarını ve
+        süreç havuzunu durdur, ardından tamponda bekleyen olayları yaz
+        
+        Args:
+            timeout: Her iş parçacığının bitmesi için beklenecek en uzun süre (saniye)
+        """
+        self.stopping.set()
+        # Penceresi henüz kapanmamış gruplar da konum hesabına gönderilir
+        for group in self.event_buffer.flush():
+            self.event_queue.put(group)
+        # Kuyruk sırayla işlendiği için işaret, önceki tüm gruplardan sonra okunur
+        self.event_queue.put(None)
+        self.processor_thread.join(timeout)
+        if self.executor is not None:
+            self.result_thread.join(timeout)
+            self.executor.shutdown(wait=True)
+        # Tamponda bekleyen olayları veritabanına yaz
+        flush_events()
         
     def notify_authorities(self, location):
         alert_data = {
@@ -112,4 +414,13 @@ class GunShotDetectionServer:
             'location': location,
             'timestamp': time.time()
         }
-        send_alert(alert_data) 
\ No newline at end of file
+        with ALERT_SECONDS.time():
+            sent = send_alert(alert_data)
+        # send_alert hata durumunda istisna yerine False döndürür
+        if sent:
+            ALERTS_SENT.inc()
+        else:
+            ALERTS_FAILED.inc()
+    
+    def get_metrics(self):
+        return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
\ No newline at end of file
@@ -1,17 +1,30 @@
 import requests
+import base64
 import json
 import logging
+import os
+import queue
+import random
+import threading
+import time
 from datetime import datetime
+from frames import encode_report, encode_batch, frame_size, FRAME_HEADER, CONTENT_TYPE
+import tracing
 
-def send_data_to_server(event_data):
+@tracing.traced('send_data_to_server')
+def send_data_to_server(event_data, max_retries=2, max_retry_after=5.0):
     """
     Sensör verilerini merkezi sunucuya gönder
     
+    Sunucu 429/503 ile yanıt verirse Retry-After süresi (en fazla
+    max_retry_after saniye) beklenip istek en fazla max_retries kez tekrarlanır.
+    
     Args:
         event_data: {
             'timestamp': float,
             'gps': (float, float),
             'audio_data': list,
+            'audio_snippet': bytes (isteğe bağlı, snippet_codec çıktısı),
             'sensor_id': str
         }
     """
@@ -19,22 +32,334 @@ def send_data_to_server(event_data):
         # Sunucu adresi (örnek)
         server_url = 'http://localhost:5000/api/event'
         
+        # Sıkıştırılmış kesit varsa ham örnekler yerine base64 olarak gönderilir
+        if event_data.get('audio_snippet') is not None:
+            event_data = dict(event_data)
+            event_data['audio_snippet'] = base64.b64encode(event_data['audio_snippet']).decode('ascii')
+            event_data.pop('audio_data', None)
+        
         # Veriyi JSON formatına dönüştür
         json_data = json.dumps(event_data)
         
-        # Sunucuya POST isteği gönder
+        for attempt in range(max_retries + 1):
+            # Sunucuya POST isteği gönder
+            response = requests.post(
+                server_url,
+                data=json_data,
+                headers={'Content-Type': 'application/json'},
+                timeout=5.0
+            )
+            
+            # Eşzamansız modda sunucu raporu 202 ile kabul eder
+            if response.status_code in (200, 202):
+                return True
+            if response.status_code in (429, 503) and attempt < max_retries:
+                retry_after = float(response.headers.get('Retry-After', 1.0))
+                time.sleep(min(retry_after, max_retry_after))
+                continue
+            logging.error(f"Sunucu hatası: {response.status_code}")
+            return False
+            
+    except Exception as e:
+        logging.error(f"Veri gönderilemedi: {str(e)}")
+        return False 
+
+@tracing.traced('send_batch_to_server')
+def send_batch_to_server(events):
+    """
+    Birden çok sensör raporunu ikili çerçeveler halinde tek istekle gönder
+    
+    Args:
+        events: [{'timestamp', 'gps', 'audio_data', 'sensor_id'}, ...]
+    """
+    try:
+        # Sunucu adresi (örnek)
+        server_url = 'http://localhost:5000/api/events/batch'
+        
         response = requests.post(
             server_url,
-            data=json_data,
-            headers={'Content-Type': 'application/json'}
+            data=encode_batch(events),
+            headers={'Content-Type': CONTENT_TYPE},
+            timeout=5.0
         )
         
-        if response.status_code == 200:
+        if response.status_code in (200, 202):
             return True
         else:
             logging.error(f"Sunucu hatası: {response.status_code}")
             return False
-            
+    
     except Exception as e:
         logging.error(f"Veri gönderilemedi: {str(e)}")
-        return False 
\ No newline at end of file
+        return False
+
+class SpoolQueue:
+    def __init__(self, directory):
+        """
+        Bağlantı yokken gönderilemeyen çerçeveleri saklayan, diske yazılan
+        yalnızca-ekleme kuyruğu. Okuma konumu ayrı bir dosyada tutulur;
+        sunucunun sürekli reddettiği çerçeveler ayrı bir dosyaya taşınır.
+        
+        Args:
+            directory: Kuyruk dosyalarının dizini
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, 'spool.bin')
+        self.offset_path = os.path.join(directory, 'spool.offset')
+        self.dead_letter_path = os.path.join(directory, 'spool.dead')
+        self.lock = threading.Lock()
+        self.offset = 0
+        if os.path.exists(self.offset_path):
+            with open(self.offset_path) as f:
+                self.offset = int(f.read().strip() or 0)
+        self.recover()
+    
+    def recover(self):
+        # Çökme sırasında yarım yazılmış son çerçeveyi at; yalnızca başlıklar okunur
+        if not os.path.exists(self.data_path):
+            self.offset = 0
+            return
+        size = os.path.getsize(self.data_path)
+        end = min(self.offset, size)
+        with open(self.data_path, 'rb') as f:
+            while True:
+                f.seek(end)
+                header = f.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    break
+                try:
+                    length = frame_size(header)
+                except ValueError:
+                    break
+                if end + length > size:
+                    break
+                end += length
+        if end < size:
+            logging.warning(f"Spool dosyası {size - end} bayt eksik veriyle kırpıldı")
+            with open(self.data_path, 'r+b') as f:
+                f.truncate(end)
+    
+    def size(self):
+        return os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+    
+    def pending(self):
+        return self.size() > self.offset
+    
+    @tracing.traced('spool_append')
+    def append(self, frames):
+        with self.lock:
+            with open(self.data_path, 'ab') as f:
+                f.write(b''.join(frames))
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def peek(self, max_frames):
+        """
+        Sıradaki en fazla max_frames çerçeveyi oku
+        
+        Returns:
+            (gövde, bitiş konumu, çerçeve sayısı)
+        """
+        # Dosyanın tamamı değil, yalnızca okuma konumundan itibaren istenen çerçeveler okunur
+        frames = []
+        with self.lock:
+            with open(self.data_path, 'rb') as f:
+                f.seek(self.offset)
+                while len(frames) < max_frames:
+                    frame = self.read_frame(f)
+                    if frame is None:
+                        break
+                    frames.append(frame)
+            body = b''.join(frames)
+            return body, self.offset + len(body), len(frames)
+    
+    def read_frame(self, f):
+        header = f.read(FRAME_HEADER.size)
+        if len(header) < FRAME_HEADER.size:
+            return None
+        length = frame_size(header) - FRAME_HEADER.size
+        rest = f.read(length)
+        if len(rest) < length:
+            return None
+        return header + rest
+    
+    def dead_letter(self, body, end_offset):
+        """Sıradaki çerçeveleri inceleme için ayrı dosyaya taşı ve kuyruktan düş"""
+        with self.lock:
+            with open(self.dead_letter_path, 'ab') as f:
+                f.write(body)
+                f.flush()
+                os.fsync(f.fileno())
+        self.commit(end_offset)
+    
+    def commit(self, end_offset):
+        """Gönderilen çerçeveleri kuyruktan düş"""
+        with self.lock:
+            if end_offset >= self.size():
+                # Kuyruk boşaldı; dosyaları sıfırla
+                if os.path.exists(self.data_path):
+                    os.remove(self.data_path)
+                self.offset = 0
+            else:
+                self.offset = end_offset
+            temp_path = self.offset_path + '.tmp'
+            with open(temp_path, 'w') as f:
+                f.write(str(self.offset))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.offset_path)
+
+class UplinkClient:
+    def __init__(self, server_url='http://localhost:5000', spool_dir='uplink_spool',
+                 batch_window=0.05, max_batch=32, timeout=5.0, max_retries=3,
+                 backoff_base=0.5, backoff_max=30.0, max_replay_attempts=10):
+        """
+        Kalıcı bağlantı kullanan, raporları kısa bir pencerede toplayıp ikili
+        çerçeveler halinde gönderen ve bağlantı yokken diske biriktiren istemci
+        
+        Args:
+            server_url: Sunucu kök adresi
+            spool_dir: Gönderilemeyen raporların biriktirileceği dizin
+            batch_window: Raporların tek istekte toplanacağı süre (saniye)
+            max_batch: Bir istekteki en fazla rapor sayısı
+            timeout: HTTP istek zaman aşımı (saniye)
+            max_retries: Bir isteğin diske yazılmadan önce en fazla deneme sayısı
+            backoff_base: Yeniden deneme bekleme süresinin taban değeri (saniye)
+            backoff_max: En uzun yeniden deneme bekleme süresi (saniye)
+            max_replay_attempts: Sunucunun hata ile yanıtladığı bir biriktirilmiş
+                grubun ayrı dosyaya taşınmadan önce en fazla deneme sayısı
+        """
+        self.batch_url = server_url.rstrip('/') + '/api/events/batch'
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_replay_attempts = max_replay_attempts
+        self.logger = logging.getLogger(__name__)
+        
+        # Tek TCP/TLS bağlantısını istekler arasında yeniden kullan
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Content-Type'] = CONTENT_TYPE
+        
+        self.spool = SpoolQueue(spool_dir)
+        self.outbox = queue.Queue()
+        self.replay_after = 0.0
+        self.replay_failures = 0
+        # Kuyruk başındaki grubun sunucu tarafından reddedilme sayısı
+        self.head_attempts = 0
+        self.last_status = None
+        self.running = True
+        self.sender_thread = threading.Thread(target=self.run)
+        self.sender_thread.daemon = True
+        self.sender_thread.start()
+    
+    def send(self, event_data):
+        """Raporu gönderim kuyruğuna al (ağ beklemeden döner)"""
+        self.outbox.put(encode_report(event_data))
+        return True
+    
+    def close(self, timeout=10.0):
+        """Kuyruktaki raporları gönder; gönderilemeyenleri diske yaz"""
+        self.running = False
+        self.sender_thread.join(timeout)
+        remaining = []
+        while True:
+            try:
+                remaining.append(self.outbox.get_nowait())
+            except queue.Empty:
+                break
+        if remaining:
+            self.spool.append(remaining)
+        self.session.close()
+    
+    def run(self):
+        while self.running or not self.outbox.empty():
+            frames = self.collect_batch()
+            if frames:
+                if self.spool.pending():
+                    # Sıra korunmalı: bekleyen kayıtlar varken yeni raporlar da diske
+                    self.spool.append(frames)
+                elif not self.post(b''.join(frames)):
+                    self.spool.append(frames)
+                    self.schedule_replay()
+            if self.spool.pending() and time.time() >= self.replay_after:
+                self.replay_spool()
+    
+    def collect_batch(self):
+        # İlk raporu bekle, ardından pencere süresince gelenleri ekle
+        try:
+            frames = [self.outbox.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.batch_window
+        while len(frames) < self.max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                frames.append(self.outbox.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return frames
+    
+    @tracing.traced('replay_spool')
+    def replay_spool(self):
+        # Biriken raporları yazıldıkları sırayla gönder
+        while self.spool.pending():
+            body, end_offset, count = self.spool.peek(self.max_batch)
+            if count == 0:
+                break
+            if not self.post(body, retries=1):
+                # Bağlantı hataları sayılmaz; yalnızca sunucunun yanıt verip
+                # işleyemediği grup sınırdan sonra kuyruğun önünden çekilir
+                if self.last_status is not None:
+                    self.head_attempts += 1
+                if self.head_attempts < self.max_replay_attempts:
+                    self.schedule_replay()
+                    return
+                self.logger.error(f"{count} rapor {self.head_attempts} denemede gönderilemedi; "
+                                  f"{self.spool.dead_letter_path} dosyasına taşındı")
+                self.spool.dead_letter(body, end_offset)
+            else:
+                self.spool.commit(end_offset)
+            self.head_attempts = 0
+        self.replay_failures = 0
+    
+    def schedule_replay(self):
+        self.replay_failures += 1
+        self.replay_after = time.time() + self.backoff_delay(self.replay_failures)
+    
+    def backoff_delay(self, attempt, retry_after=None):
+        # Üstel geri çekilme ve tam rastgele sapma (full jitter)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    
+    @tracing.traced('uplink_post')
+    def post(self, body, retries=None):
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries):
+            retry_after = None
+            self.last_status = None
+            try:
+                response = self.session.post(self.batch_url, data=body, timeout=self.timeout)
+                self.last_status = response.status_code
+                if response.status_code in (200, 202):
+                    return True
+                self.logger.error(f"Sunucu hatası: {response.status_code}")
+                if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+                    # İstemci hatası kalıcıdır; tekrar denemek anlamsız
+                    # (408 ve 429 sunucunun geçici olarak yetişemediğini bildirir)
+                    return True
+                if 'Retry-After' in response.headers:
+                    retry_after = float(response.headers['Retry-After'])
+            except Exception as e:
+                self.logger.error(f"Veri gönderilemedi: {str(e)}")
+            if attempt + 1 < retries:
+                time.sleep(self.backoff_delay(attempt, retry_after))
+        return False
\ No newline at end of file
@@ -1,6 +1,13 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, DESCENDING, GEOSPHERE
+from pymongo.errors import BulkWriteError, InvalidDocument, DuplicateKeyError
+from bson import ObjectId
+import argparse
 import logging
+import threading
+import os
+import atexit
 from datetime import datetime
+from spatial import BoundingBox, Circle, EARTH_RADIUS
 
 class Database:
     def __init__(self):
@@ -13,10 +20,257 @@ class Database:
             self.logger.error(f"Veritabanı bağlantısı başarısız: {str(e)}")
             raise
 
+# Aynı _id ile tekrar yazma: belge zaten kaydedilmiş
+DUPLICATE_KEY = 11000
+# Sunucu/ağ kaynaklı, aynı belgeyle tekrar denenmesi anlamlı olan yazma hataları
+RETRYABLE_WRITE_CODES = {6, 7, 89, 91, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+
+class EventWriteBuffer:
+    def __init__(self, database, batch_size=100, flush_interval=1.0, max_buffer=10000):
+        """
+        Olayları bellekte toplayıp insert_many ile toplu yazan tampon
+        
+        Args:
+            database: Paylaşılan Database nesnesi
+            batch_size: Bu sayıda olay biriktiğinde hemen yazılır
+            flush_interval: Bekleyen olayların en fazla bekleme süresi (saniye)
+            max_buffer: Yazma başarısız olursa bellekte tutulacak en fazla olay sayısı
+        """
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.pending = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = True
+        self.flush_thread = threading.Thread(target=self.run)
+        self.flush_thread.daemon = True
+        self.flush_thread.start()
+    
+    def add(self, event_data):
+        with self.lock:
+            self.pending.append(event_data)
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.wakeup.set()
+    
+    def run(self):
+        while self.running:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+    
+    def flush(self):
+        """Bekleyen olayları senkron olarak yaz"""
+        with self.flush_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return True
+            try:
+                self.database.events.insert_many(batch, ordered=False)
+                return True
+            except BulkWriteError as e:
+                # ordered=False: hata listesinde olmayan belgeler yazıldı
+                retry = self.retryable_documents(batch, e.details.get('writeErrors', []))
+            except InvalidDocument as e:
+                # Ör. DocumentTooLarge; hangi belgenin bozuk olduğu bilinmediğinden tek tek yaz
+                logging.error(f"Toplu yazma geçersiz belge nedeniyle başarısız: {str(e)}")
+                retry = self.insert_individually(batch)
+            except Exception as e:
+                logging.error(f"Olaylar kaydedilemedi: {str(e)}")
+                retry = batch
+            if not retry:
+                return True
+            with self.lock:
+                # Sonraki denemede tekrar yazılmak üzere geri koy (sınırlı)
+                self.pending = (retry + self.pending)[-self.max_buffer:]
+            return False
+    
+    def retryable_documents(self, batch, write_errors):
+        retry = []
+        for error in write_errors:
+            code = error.get('code')
+            if code == DUPLICATE_KEY:
+                # Önceki denemede yazılmış
+                continue
+            if code in RETRYABLE_WRITE_CODES:
+                retry.append(batch[error['index']])
+            else:
+                logging.error(f"Olay kalıcı hata nedeniyle atıldı ({code}): {error.get('errmsg')}")
+        return retry
+    
+    def insert_individually(self, batch):
+        retry = []
+        for event_data in batch:
+            try:
+                self.database.events.insert_one(event_data)
+            except DuplicateKeyError:
+                pass
+            except InvalidDocument as e:
+                logging.error(f"Olay geçersiz belge nedeniyle atıldı: {str(e)}")
+            except Exception as e:
+                logging.error(f"Olay kaydedilemedi: {str(e)}")
+                retry.append(event_data)
+        return retry
+    
+    def close(self):
+        self.running = False
+        self.wakeup.set()
+        self.flush_thread.join(timeout=5.0)
+        self.flush()
+
+# Özet sorgularda döndürülen alanlar (sensor_data ve ses verisi hariç)
+SUMMARY_PROJECTION = {'timestamp': 1, 'location': 1, 'created_at': 1}
+
+# Süreç genelinde tek MongoClient (bağlantı havuzu) ve yazma tamponu
+_database = None
+_write_buffer = None
+_event_store = None
+_database_lock = threading.Lock()
+
+def get_database():
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = Database()
+        return _database
+
+def get_write_buffer():
+    global _write_buffer
+    database = get_database()
+    with _database_lock:
+        if _write_buffer is None:
+            _write_buffer = EventWriteBuffer(database)
+            atexit.register(_write_buffer.close)
+        return _write_buffer
+
+class MongoEventStore:
+    """
+    MongoDB tabanlı olay deposu
+    
+    Olay depoları add/find/flush/ensure_indexes/migrate/close ile
+    encode_cursor/decode_cursor yöntemlerini sağlar; event_log.EventLog
+    aynı arayüzü gömülü bir dosya deposu olarak uygular.
+    """
+    def add(self, event_data):
+        # Konum sorguları için GeoJSON nokta (boylam, enlem sırasında)
+        lat, lon = event_data['location']
+        event_data['geo'] = {'type': 'Point', 'coordinates': [lon, lat]}
+        get_write_buffer().add(event_data)
+    
+    def flush(self):
+        return flush_events_buffer()
+    
+    def ensure_indexes(self):
+        events = get_database().events
+        events.create_index([('timestamp', DESCENDING), ('_id', DESCENDING)])
+        events.create_index([('geo', GEOSPHERE), ('timestamp', DESCENDING)])
+        return True
+    
+    def migrate(self):
+        # geo alanı olmayan eski olaylar konum dizisinden doldurulur; tüm
+        # koleksiyonu taradığı için açılışta değil, ayrı komutla bir kez çalıştırılır
+        result = get_database().events.update_many({'geo': {'$exists': False}, 'location': {'$exists': True}}, [{'$set': {'geo': {
+            'type': 'Point',
+            'coordinates': [{'$arrayElemAt': ['$location', 1]}, {'$arrayElemAt': ['$location', 0]}]
+        }}}])
+        return result.modified_count
+    
+    def close(self):
+        if _write_buffer is not None:
+            _write_buffer.close()
+    
+    def find(self, since_datetime, fields='full', after=None, limit=None, batch_size=500, area=None):
+        query = {'timestamp': {'$gte': since_datetime.timestamp()}}
+        if area is not None:
+            query['geo'] = {'$geoWithin': area_query(area)}
+        if after is not None:
+            timestamp, event_id = after
+            query = {'$and': [query, {'$or': [
+                {'timestamp': {'$lt': timestamp}},
+                {'timestamp': timestamp, '_id': {'$lt': event_id}}
+            ]}]}
+        projection = SUMMARY_PROJECTION if fields == 'summary' else None
+        
+        db = get_database()
+        # Henüz yazılmamış olaylar da sorguya dahil olsun
+        self.flush()
+        cursor = db.events.find(query, projection).sort([('timestamp', DESCENDING), ('_id', DESCENDING)])
+        cursor = cursor.batch_size(batch_size)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+    
+    def encode_cursor(self, event):
+        return f"{event['timestamp']!r}_{event['_id']}"
+    
+    def decode_cursor(self, token):
+        timestamp, event_id = token.rsplit('_', 1)
+        if not ObjectId.is_valid(event_id):
+            raise ValueError(f"Geçersiz imleç: {token}")
+        return float(timestamp), ObjectId(event_id)
+
+def area_query(area):
+    """spatial alan filtresini $geoWithin ifadesine dönüştür"""
+    if isinstance(area, Circle):
+        return {'$centerSphere': [[area.lon, area.lat], area.radius / EARTH_RADIUS]}
+    if isinstance(area, BoundingBox):
+        points = [(area.min_lat, area.min_lon), (area.min_lat, area.max_lon),
+                  (area.max_lat, area.max_lon), (area.max_lat, area.min_lon)]
+    else:
+        points = area.points
+    ring = [[lon, lat] for lat, lon in points]
+    ring.append(ring[0])
+    return {'$geometry': {'type': 'Polygon', 'coordinates': [ring]}}
+
+def get_event_store():
+    """
+    Yapılandırılmış olay deposunu döndür
+    
+    GUNSHOT_EVENT_STORE ortam değişkeni 'mongodb' (varsayılan) veya
+    'embedded' olabilir; gömülü depo GUNSHOT_EVENT_LOG_DIR dizinini kullanır.
+    """
+    global _event_store
+    with _database_lock:
+        if _event_store is None:
+            backend = os.environ.get('GUNSHOT_EVENT_STORE', 'mongodb')
+            if backend == 'embedded':
+                from event_log import EventLog
+                _event_store = EventLog(os.environ.get('GUNSHOT_EVENT_LOG_DIR', 'event_log'))
+                atexit.register(_event_store.close)
+            elif backend == 'mongodb':
+                _event_store = MongoEventStore()
+            else:
+                raise ValueError(f"Bilinmeyen olay deposu: {backend}")
+        return _event_store
+
+def set_event_store(store):
+    """Olay deposunu değiştir (ör. gömülü depo veya farklı bir dizin için)"""
+    global _event_store
+    with _database_lock:
+        _event_store = store
+
+def flush_events_buffer():
+    if _write_buffer is not None:
+        return _write_buffer.flush()
+    return True
+
+def flush_events():
+    """Bekleyen olayları hemen yaz (kapanışta çağrılır)"""
+    if _event_store is not None:
+        return _event_store.flush()
+    return True
+
 def store_event(event_data):
     """
     Olay verilerini veritabanına kaydet
     
+    Olaylar yapılandırılmış depoya eklenir; MongoDB deposunda paylaşılan
+    yazma tamponu boyut/süre eşiğinde insert_many ile toplu yazar.
+    
     Args:
         event_data: {
             'timestamp': float,
@@ -25,14 +279,54 @@ def store_event(event_data):
         }
     """
     try:
-        db = Database()
         event_data['created_at'] = datetime.now()
-        db.events.insert_one(event_data)
+        event_data['location'] = [float(value) for value in event_data['location']]
+        get_event_store().add(event_data)
         return True
     except Exception as e:
         logging.error(f"Olay kaydedilemedi: {str(e)}")
         return False
 
+def ensure_indexes():
+    """Sorgu indekslerini oluştur (sunucu açılışında çağrılır)"""
+    try:
+        return get_event_store().ensure_indexes()
+    except Exception as e:
+        logging.error(f"İndeksler oluşturulamadı: {str(e)}")
+        return False
+
+def migrate_events():
+    """
+    Eski olayları güncel şemaya taşı (python database.py migrate)
+    
+    Returns:
+        Güncellenen olay sayısı
+    """
+    return get_event_store().migrate()
+
+def find_events(since_datetime, fields='full', after=None, limit=None, batch_size=500, area=None):
+    """
+    Belirli bir tarihten sonraki olaylar için en yeniden eskiye sıralı,
+    sonuçları parça parça getiren bir imleç döndür
+    
+    Args:
+        since_datetime: datetime object
+        fields: 'summary' (yalnızca zaman ve konum) veya 'full'
+        after: decode_cursor() ile çözülmüş sayfa imleci; bu olaydan sonrakiler getirilir
+        limit: En fazla olay sayısı
+        batch_size: Veritabanından tek seferde alınan olay sayısı
+        area: İsteğe bağlı spatial.BoundingBox, Circle veya Polygon filtresi
+    """
+    return get_event_store().find(since_datetime, fields=fields, after=after, limit=limit,
+                                  batch_size=batch_size, area=area)
+
+def encode_cursor(event):
+    """Olaydan sonraki sayfayı gösteren imleç metni"""
+    return get_event_store().encode_cursor(event)
+
+def decode_cursor(token):
+    return get_event_store().decode_cursor(token)
+
 def get_events(since_datetime):
     """
     Belirli bir tarihten sonraki olayları getir
@@ -41,12 +335,18 @@ def get_events(since_datetime):
         since_datetime: datetime object
     """
     try:
-        db = Database()
-        events = db.events.find({
-            'timestamp': {'$gte': since_datetime.timestamp()}
-        }).sort('timestamp', -1)
-        
-        return list(events)
+        return list(find_events(since_datetime))
     except Exception as e:
         logging.error(f"Olaylar getirilemedi: {str(e)}")
-        return [] 
\ No newline at end of file
+        return []
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Olay deposu bakım komutları')
+    parser.add_argument('command', choices=['migrate'], help='migrate: eski olaylara geo alanını ekle')
+    args = parser.parse_args(argv)
+    if args.command == 'migrate':
+        print(f"{migrate_events()} olay güncellendi")
+    return 0
+
+if __name__ == '__main__':
+    main()
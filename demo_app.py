@@ -8,6 +8,7 @@ import random
 from datetime import datetime
 import json
 from notification import send_alert
+from simulation import random_location, propagation_delay
 import folium
 from folium import plugins
 import os
@@ -284,19 +285,12 @@ class GunShotDetectionDemo(QMainWindow):
         
     def randomize_sensors(self):
         """Mikrofonları belirlenen alan içinde rastgele yerleştir"""
-        center_lat, center_lon = self.center_location
-        
         for sensor_name in self.sensors:
             # Rastgele açı ve mesafe
-            angle = random.uniform(0, 360)
-            distance = random.uniform(0, self.radius)
-            
-            # Yeni koordinatları hesapla
-            origin = geopy.Point(center_lat, center_lon)
-            destination = geodesic(meters=distance).destination(origin, angle)
+            lat, lon = random_location(self.center_location, self.radius)
             
-            self.sensors[sensor_name] = (destination.latitude, destination.longitude)
-            self.log(f"{sensor_name} yeni konuma taşındı: {destination.latitude:.6f}, {destination.longitude:.6f}")
+            self.sensors[sensor_name] = (lat, lon)
+            self.log(f"{sensor_name} yeni konuma taşındı: {lat:.6f}, {lon:.6f}")
         
         self.create_initial_map()
         
@@ -532,17 +526,7 @@ class GunShotDetectionDemo(QMainWindow):
         
     def simulate_gunshot(self):
         # Merkez noktadan rastgele bir konumda silah sesi oluştur
-        center_lat, center_lon = self.center_location
-        
-        # Rastgele açı ve mesafe
-        angle = random.uniform(0, 360)
-        distance = random.uniform(0, self.radius)  # metre cinsinden
-        
-        # Yeni koordinatları hesapla
-        origin = geopy.Point(center_lat, center_lon)
-        destination = geodesic(meters=distance).destination(origin, angle)
-        
-        actual_lat, actual_lon = destination.latitude, destination.longitude
+        actual_lat, actual_lon = random_location(self.center_location, self.radius)
         
         self.log(f"Silah sesi tespit edildi!")
         self.log(f"Gerçek Konum: {actual_lat:.6f}, {actual_lon:.6f}")
@@ -553,14 +537,9 @@ class GunShotDetectionDemo(QMainWindow):
         
         # Her sensör için ses algılama simülasyonu
         for sensor_name, sensor_pos in self.sensors.items():
-            # Mesafeyi metre cinsinden hesapla
-            distance = geodesic(
-                (actual_lat, actual_lon),
-                sensor_pos
-            ).meters
-            
-            # Ses hızı: 343 m/s
-            delay = (distance / 343.0) * 1000  # milisaniye cinsinden
+            # Mesafe (metre) ve ses gecikmesi; ses hızı: 343 m/s
+            distance, delay = propagation_delay((actual_lat, actual_lon), sensor_pos)
+            delay *= 1000  # milisaniye cinsinden
             self.log(f"{sensor_name} sesi algıladı - Mesafe: {distance:.2f}m, Gecikme: {delay:.2f}ms")
         
         # Haritayı güncelle
@@ -0,0 +1,455 @@
+import os
+import sys
+import mmap
+import time
+import zlib
+import fcntl
+import heapq
+import bisect
+import struct
+import logging
+import argparse
+import threading
+from array import array
+from datetime import datetime
+import bson
+from spatial import geohash_encode, geohash_cover
+
+# Kayıt düzeni (little-endian):
+#   id (Q) | timestamp (d) | enlem (d) | boylam (d) | created_at (d) |
+#   yük uzunluğu (I) | crc32 (I) | yük (BSON) | toplam kayıt uzunluğu (I)
+# Sabit başlık özet sorgular için yükü çözmeden okunur; sondaki uzunluk
+# alanı segmentin sondan başa doğru taranmasını sağlar.
+RECORD_HEADER = struct.Struct('<QddddII')
+RECORD_TRAILER = struct.Struct('<I')
+HEADER_FIELDS = ('_id', 'timestamp', 'location', 'created_at')
+
+SEGMENT_PREFIX = 'events-'
+SEGMENT_SUFFIX = '.log'
+# Dizini aynı anda yalnızca bir sürecin açmasını sağlayan kilit dosyası
+LOCK_NAME = 'LOCK'
+
+# Konum indeksinin geohash uzunluğu (~150 m x 150 m hücreler)
+GEOHASH_PRECISION = 7
+# Konum indeksinde (segment sırası, konum) tek bir tamsayıda saklanır
+POSITION_BITS = 40
+
+def encode_record(event_id, event_data):
+    """Olayı sabit başlıklı ikili kayda dönüştür"""
+    lat, lon = event_data['location']
+    created_at = event_data.get('created_at') or datetime.now()
+    payload = bson.encode({key: value for key, value in event_data.items() if key not in HEADER_FIELDS})
+    header = RECORD_HEADER.pack(event_id, float(event_data['timestamp']), float(lat), float(lon),
+                                created_at.timestamp(), len(payload), 0)
+    crc = zlib.crc32(payload, zlib.crc32(header[:-4]))
+    header = header[:-4] + struct.pack('<I', crc)
+    length = len(header) + len(payload) + RECORD_TRAILER.size
+    return header + payload + RECORD_TRAILER.pack(length)
+
+def read_header(buffer, offset):
+    """
+    offset konumundaki kaydın başlığını oku ve doğrula
+    
+    Returns:
+        (id, timestamp, lat, lon, created_at, yük uzunluğu, kayıt uzunluğu)
+        veya kayıt eksik/bozuksa None
+    """
+    if len(buffer) - offset < RECORD_HEADER.size:
+        return None
+    event_id, timestamp, lat, lon, created_at, payload_length, crc = RECORD_HEADER.unpack_from(buffer, offset)
+    length = RECORD_HEADER.size + payload_length + RECORD_TRAILER.size
+    if len(buffer) - offset < length:
+        return None
+    payload_start = offset + RECORD_HEADER.size
+    expected = zlib.crc32(buffer[payload_start:payload_start + payload_length],
+                          zlib.crc32(buffer[offset:payload_start - 4]))
+    if expected != crc or RECORD_TRAILER.unpack_from(buffer, payload_start + payload_length)[0] != length:
+        return None
+    return event_id, timestamp, lat, lon, created_at, payload_length, length
+
+class Segment:
+    def __init__(self, path, first_id):
+        self.path = path
+        self.first_id = first_id
+        self.size = 0
+        self.map = None
+        self.mapped_size = 0
+    
+    def view(self):
+        # Salt okunur bellek eşlemesi; segment büyüdükçe yeniden eşlenir. Eski
+        # eşleme onu kullanan okuyucular bitince çöp toplayıcı tarafından kapatılır
+        if self.size == 0:
+            return b''
+        if self.map is None or self.mapped_size < self.size:
+            with open(self.path, 'rb') as f:
+                self.map = mmap.mmap(f.fileno(), self.size, access=mmap.ACCESS_READ)
+            self.mapped_size = self.size
+        return self.map
+    
+    def release(self):
+        self.map = None
+        self.mapped_size = 0
+
+class EventLog:
+    def __init__(self, directory='event_log', segment_size=64 * 1024 * 1024, index_interval=64,
+                 fsync_on_flush=True):
+        """
+        Gömülü, segmentli ve yalnızca-ekleme olay deposu
+        
+        Olaylar artan id ile segment dosyalarına yazılır ve okuma için
+        belleğe eşlenir. Her index_interval kayıtta bir (o ana kadarki en
+        büyük timestamp, konum) çifti seyrek indekse eklenir; zaman aralığı
+        sorguları bu indekste ikili arama ile başlangıç noktasını bulur.
+        
+        Konum sorguları için her kayıt bellekte geohash hücresine göre
+        indekslenir; alan sorguları yalnızca alanı kaplayan hücreleri tarar.
+        
+        Args:
+            directory: Segment dosyalarının dizini
+            segment_size: Bu boyutu aşan segment kapatılıp yenisine geçilir (bayt)
+            index_interval: Seyrek indeksin kayıt aralığı
+            fsync_on_flush: flush() çağrısında dosyayı diske zorla
+        
+        Raises:
+            RuntimeError: Dizin başka bir süreç tarafından açık tutuluyorsa
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.index_interval = index_interval
+        self.fsync_on_flush = fsync_on_flush
+        self.logger = logging.getLogger(__name__)
+        self.lock = threading.Lock()
+        self.segments = []
+        self.next_id = 0
+        self.writer = None
+        self.reset_index()
+        os.makedirs(directory, exist_ok=True)
+        self.lock_directory()
+        self.open_segments()
+    
+    def lock_directory(self):
+        # Segmentler ve indeks tek sürecin belleğinde tutulur; başka bir süreç
+        # (ör. çalışan sunucu varken sıkıştırma aracı) dosyaları değiştiremez
+        self.lock_file = open(os.path.join(self.directory, LOCK_NAME), 'a')
+        try:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.lock_file.close()
+            raise RuntimeError(f"{self.directory} başka bir süreç tarafından kullanılıyor")
+    
+    def reset_index(self):
+        # Seyrek indeks: artan en büyük timestamp ve (segment sırası, konum)
+        self.index_timestamps = []
+        self.index_positions = []
+        self.max_timestamp = float('-inf')
+        self.record_count = 0
+        # Konum indeksi: geohash hücresi -> kayıt konumları (eklenme sırasında)
+        # ve aynı sırada hücredeki o ana kadarki en büyük timestamp
+        self.cells = {}
+        self.cell_timestamps = {}
+        self.cell_keys = []
+    
+    def segment_path(self, first_id):
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{first_id:016d}{SEGMENT_SUFFIX}")
+    
+    def open_segments(self):
+        names = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        for name in names:
+            first_id = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            self.segments.append(Segment(os.path.join(self.directory, name), first_id))
+        if not self.segments:
+            self.segments.append(Segment(self.segment_path(0), 0))
+            open(self.segments[0].path, 'ab').close()
+        for index in range(len(self.segments)):
+            self.scan_segment(index)
+        self.writer = open(self.segments[-1].path, 'ab')
+    
+    def scan_segment(self, segment_index):
+        # Başlıkları sırayla okuyarak indeksi kur; son segmentteki yarım kaydı at
+        segment = self.segments[segment_index]
+        with open(segment.path, 'rb') as f:
+            data = f.read()
+        offset = 0
+        while offset < len(data):
+            header = read_header(data, offset)
+            if header is None:
+                break
+            self.index_record(segment_index, offset, header[1], header[2], header[3])
+            self.next_id = header[0] + 1
+            offset += header[6]
+        if offset < len(data):
+            if segment_index != len(self.segments) - 1:
+                raise ValueError(f"Bozuk segment: {segment.path}")
+            self.logger.warning(f"{segment.path}: {len(data) - offset} baytlık yarım kayıt kırpıldı")
+            with open(segment.path, 'r+b') as f:
+                f.truncate(offset)
+                f.flush()
+                os.fsync(f.fileno())
+        segment.size = offset
+        self.next_id = max(self.next_id, segment.first_id)
+    
+    def index_record(self, segment_index, offset, timestamp, lat, lon):
+        self.max_timestamp = max(self.max_timestamp, timestamp)
+        if self.record_count % self.index_interval == 0:
+            self.index_timestamps.append(self.max_timestamp)
+            self.index_positions.append((segment_index, offset))
+        self.record_count += 1
+        
+        cell = geohash_encode(lat, lon, GEOHASH_PRECISION)
+        positions = self.cells.get(cell)
+        if positions is None:
+            positions = self.cells[cell] = array('Q')
+            self.cell_timestamps[cell] = array('d')
+            bisect.insort(self.cell_keys, cell)
+        timestamps = self.cell_timestamps[cell]
+        positions.append(segment_index << POSITION_BITS | offset)
+        timestamps.append(max(timestamp, timestamps[-1]) if timestamps else timestamp)
+    
+    def add(self, event_data):
+        with self.lock:
+            if self.segments[-1].size >= self.segment_size:
+                self.roll_segment()
+            record = encode_record(self.next_id, event_data)
+            segment = self.segments[-1]
+            self.writer.write(record)
+            self.writer.flush()
+            lat, lon = event_data['location']
+            self.index_record(len(self.segments) - 1, segment.size, float(event_data['timestamp']),
+                              float(lat), float(lon))
+            # Okuyucular yalnızca tamamen yazılmış kayıtları görür
+            segment.size += len(record)
+            self.next_id += 1
+    
+    def roll_segment(self):
+        # Eski segmenti diske zorla, sonra yenisini oluştur; çökme olursa
+        # en kötü ihtimalle boş bir segment dosyası kalır
+        self.writer.flush()
+        os.fsync(self.writer.fileno())
+        self.writer.close()
+        segment = Segment(self.segment_path(self.next_id), self.next_id)
+        self.writer = open(segment.path, 'ab')
+        self.segments.append(segment)
+    
+    def flush(self):
+        with self.lock:
+            self.writer.flush()
+            if self.fsync_on_flush:
+                os.fsync(self.writer.fileno())
+        return True
+    
+    def ensure_indexes(self):
+        # Seyrek zaman indeksi açılışta kurulur ve eklemelerle güncellenir
+        return True
+    
+    def migrate(self):
+        # Kayıtlar her zaman güncel biçimde yazılır; taşınacak veri yok
+        return 0
+    
+    def close(self):
+        with self.lock:
+            if self.writer.closed:
+                return
+            self.writer.flush()
+            os.fsync(self.writer.fileno())
+            self.writer.close()
+            for segment in self.segments:
+                segment.release()
+            self.lock_file.close()
+    
+    def lower_bound(self, since_timestamp):
+        """Bu konumdan önceki tüm kayıtların timestamp'i since_timestamp'ten küçüktür"""
+        block = bisect.bisect_left(self.index_timestamps, since_timestamp)
+        if block == 0:
+            return (0, 0)
+        # Önceki bloğun başına kadar her şey since'ten küçük; blok içini taramak gerekir
+        return self.index_positions[block - 1]
+    
+    def area_positions(self, area, since_timestamp):
+        """
+        Alanı kaplayan hücrelerdeki kayıt konumları, en yeniden eskiye
+        
+        Hücre başına artan en büyük timestamp dizisinde ikili arama ile
+        since_timestamp'ten önceki kayıtlar atlanır. Hücre dilimleri kilit
+        altında kopyalanır; birleştirme tembel olduğundan limitli sorgular
+        yalnızca ihtiyaç duyulan kadar konum üretir.
+        """
+        slices = []
+        for prefix in geohash_cover(area.bounds(), max_precision=GEOHASH_PRECISION):
+            start = bisect.bisect_left(self.cell_keys, prefix)
+            for cell in self.cell_keys[start:]:
+                if not cell.startswith(prefix):
+                    break
+                first = bisect.bisect_left(self.cell_timestamps[cell], since_timestamp)
+                positions = self.cells[cell][first:]
+                if positions:
+                    positions.reverse()
+                    slices.append(positions)
+        return heapq.merge(*slices, reverse=True)
+    
+    def find(self, since_datetime, fields='full', after=None, limit=None, batch_size=500, area=None):
+        """
+        since_datetime sonrasındaki olayları en yeniden eskiye (id sırası) üret
+        
+        Args:
+            since_datetime: datetime object
+            fields: 'summary' (yalnızca sabit başlık) veya 'full'
+            after: decode_cursor() ile çözülmüş id; bundan eski olaylar getirilir
+            limit: En fazla olay sayısı
+            batch_size: Kullanılmaz (MongoDB deposuyla aynı arayüz için)
+            area: İsteğe bağlı spatial.BoundingBox, Circle veya Polygon filtresi
+        """
+        since_timestamp = since_datetime.timestamp()
+        if area is not None:
+            yield from self.find_in_area(since_timestamp, area, fields, after, limit)
+            return
+        with self.lock:
+            stop_segment, stop_offset = self.lower_bound(since_timestamp)
+            segments = [(index, segment, segment.size, segment.view())
+                        for index, segment in enumerate(self.segments) if index >= stop_segment]
+        
+        count = 0
+        for index, segment, size, buffer in reversed(segments):
+            if after is not None and segment.first_id >= after:
+                continue
+            offset = size
+            start = stop_offset if index == stop_segment else 0
+            while offset > start:
+                length = RECORD_TRAILER.unpack_from(buffer, offset - RECORD_TRAILER.size)[0]
+                offset -= length
+                header = RECORD_HEADER.unpack_from(buffer, offset)
+                if header[1] < since_timestamp or (after is not None and header[0] >= after):
+                    continue
+                yield self.read_event(buffer, offset, header, fields)
+                count += 1
+                if limit and count >= limit:
+                    return
+    
+    def find_in_area(self, since_timestamp, area, fields, after, limit):
+        with self.lock:
+            positions = self.area_positions(area, since_timestamp)
+            buffers = [segment.view() for segment in self.segments]
+        
+        count = 0
+        mask = (1 << POSITION_BITS) - 1
+        for position in positions:
+            buffer = buffers[position >> POSITION_BITS]
+            offset = position & mask
+            header = RECORD_HEADER.unpack_from(buffer, offset)
+            if header[1] < since_timestamp or (after is not None and header[0] >= after):
+                continue
+            if not area.contains(header[2], header[3]):
+                continue
+            yield self.read_event(buffer, offset, header, fields)
+            count += 1
+            if limit and count >= limit:
+                return
+    
+    def read_event(self, buffer, offset, header, fields):
+        event_id, timestamp, lat, lon, created_at, payload_length = header[:6]
+        event = {
+            '_id': event_id,
+            'timestamp': timestamp,
+            'location': [lat, lon],
+            'created_at': datetime.fromtimestamp(created_at)
+        }
+        if fields != 'summary':
+            payload_start = offset + RECORD_HEADER.size
+            event.update(bson.decode(buffer[payload_start:payload_start + payload_length]))
+        return event
+    
+    def encode_cursor(self, event):
+        return str(event['_id'])
+    
+    def decode_cursor(self, token):
+        return int(token)
+    
+    def compact(self, older_than=None, keep=None):
+        """
+        Kapalı segmentleri yeniden yazarak eski veya istenmeyen olayları at
+        
+        Her segment geçici dosyaya yazılıp diske zorlandıktan sonra
+        os.replace ile atomik olarak değiştirilir; işlem yarıda kalırsa her
+        segment ya eski ya yeni haliyle tutarlı kalır. Dosyaların
+        değiştirilmesi ve indeksin yeniden kurulması tek kilit altında
+        yapılır; okuyucular ya eski ya yeni segmentleri görür. Etkin
+        segmente dokunulmaz.
+        
+        Args:
+            older_than: Bu epoch zamanından eski olaylar atılır
+            keep: İsteğe bağlı filtre; olay için False dönerse olay atılır
+        
+        Returns:
+            Atılan olay sayısı
+        """
+        removed = 0
+        replacements = []
+        with self.lock:
+            sealed = self.segments[:-1]
+        for segment in sealed:
+            with open(segment.path, 'rb') as f:
+                data = f.read()
+            records = []
+            dropped = 0
+            offset = 0
+            while offset < len(data):
+                header = read_header(data, offset)
+                record = data[offset:offset + header[6]]
+                offset += header[6]
+                if older_than is not None and header[1] < older_than:
+                    dropped += 1
+                    continue
+                if keep is not None:
+                    payload = record[RECORD_HEADER.size:RECORD_HEADER.size + header[5]]
+                    event = dict(bson.decode(payload), _id=header[0], timestamp=header[1],
+                                 location=[header[2], header[3]])
+                    if not keep(event):
+                        dropped += 1
+                        continue
+                records.append(record)
+            if not dropped:
+                continue
+            
+            temp_path = segment.path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(b''.join(records))
+                f.flush()
+                os.fsync(f.fileno())
+            replacements.append((segment, temp_path))
+            removed += dropped
+        if replacements:
+            with self.lock:
+                # Eski boyut ve indeks konumları yeni dosyalarla birlikte değişir
+                for segment, temp_path in replacements:
+                    os.replace(temp_path, segment.path)
+                    segment.release()
+                self.reset_index()
+                for index in range(len(self.segments)):
+                    self.scan_segment(index)
+        return removed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gömülü olay deposu araçları')
+    parser.add_argument('command', choices=['compact', 'stats'])
+    parser.add_argument('directory')
+    parser.add_argument('--older-than-days', type=float, default=None,
+                        help='Bu kadar günden eski olayları at')
+    args = parser.parse_args(argv)
+    
+    try:
+        log = EventLog(args.directory)
+    except RuntimeError as e:
+        print(f"{e}; sunucu çalışırken bu araç kullanılamaz")
+        return 1
+    try:
+        if args.command == 'compact':
+            older_than = None
+            if args.older_than_days is not None:
+                older_than = time.time() - args.older_than_days * 86400
+            print(f"{log.compact(older_than=older_than)} olay atıldı")
+        print(f"{len(log.segments)} segment, {log.record_count} olay")
+    finally:
+        log.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import json
+import struct
+import numpy as np
+from snippet_codec import SnippetDecoder, dequantize
+
+# Sensör raporu ikili çerçevesi (little-endian):
+#   magic (4s) | sürüm (B) | örnek kodlaması (B) | sensor_id uzunluğu (H) |
+#   timestamp (d) | enlem (d) | boylam (d) | örnek verisi uzunluğu, bayt (I)
+# ardından sensor_id (utf-8) ve ham örnek verisi gelir. Toplu istek gövdesi
+# çerçevelerin art arda eklenmesinden oluşur.
+#
+# Sürüm 2'de veri bölümü, örneklerden önce uzunluk önekli (I) bir JSON ek
+# bilgi bölümüyle başlar; örnek verisi uzunluğu bu bölümü de kapsar. Böylece
+# çerçeve uzunluğu yalnızca başlıktan hesaplanmaya devam eder.
+FRAME_MAGIC = b'GSR1'
+FRAME_VERSION = 1
+FRAME_VERSION_METADATA = 2
+FRAME_HEADER = struct.Struct('<4sBBHdddI')
+METADATA_LENGTH = struct.Struct('<I')
+
+# Ek bilgi bölümünde taşınan rapor alanları
+METADATA_FIELDS = ('channel_offsets', 'gate_stats')
+
+# Örnek kodlamaları
+ENCODING_FLOAT32 = 0
+ENCODING_SNIPPET = 1  # snippet_codec ile sıkıştırılmış int16 kesit
+
+CONTENT_TYPE = 'application/octet-stream'
+
+def encode_report(event_data):
+    """
+    Sensör raporunu ikili çerçeveye dönüştür
+    
+    Args:
+        event_data: {
+            'timestamp': float,
+            'gps': (float, float),
+            'audio_data': list veya np.ndarray,
+            'audio_snippet': bytes (isteğe bağlı, snippet_codec çıktısı),
+            'sensor_id': str,
+            'channel_offsets': list (isteğe bağlı),
+            'gate_stats': dict (isteğe bağlı)
+        }
+    
+    Returns:
+        bytes; ek bilgi alanları varsa sürüm 2, yoksa sürüm 1 çerçeve
+    """
+    sensor_id = str(event_data['sensor_id']).encode('utf-8')
+    if event_data.get('audio_snippet') is not None:
+        encoding = ENCODING_SNIPPET
+        payload = bytes(event_data['audio_snippet'])
+    else:
+        encoding = ENCODING_FLOAT32
+        payload = np.asarray(event_data.get('audio_data', []), dtype='<f4').tobytes()
+    metadata = {field: event_data[field] for field in METADATA_FIELDS if event_data.get(field) is not None}
+    version = FRAME_VERSION
+    if metadata:
+        version = FRAME_VERSION_METADATA
+        metadata = json.dumps(metadata, separators=(',', ':')).encode('utf-8')
+        payload = b''.join([METADATA_LENGTH.pack(len(metadata)), metadata, payload])
+    lat, lon = event_data['gps']
+    header = FRAME_HEADER.pack(
+        FRAME_MAGIC, version, encoding, len(sensor_id),
+        float(event_data['timestamp']), float(lat), float(lon), len(payload)
+    )
+    return b''.join([header, sensor_id, payload])
+
+def encode_batch(events):
+    """Birden çok raporu tek bir istek gövdesinde birleştir"""
+    return b''.join(encode_report(event_data) for event_data in events)
+
+def frame_size(header):
+    """Başlık baytlarından çerçevenin toplam uzunluğunu hesapla"""
+    header = FRAME_HEADER.unpack_from(header)
+    if header[0] != FRAME_MAGIC:
+        raise ValueError("Geçersiz çerçeve başlığı")
+    return FRAME_HEADER.size + header[3] + header[7]
+
+def frame_length(buffer, offset=0):
+    """
+    offset konumundaki çerçevenin toplam uzunluğunu döndür
+    
+    Returns:
+        int veya çerçeve eksikse None
+    """
+    if len(buffer) - offset < FRAME_HEADER.size:
+        return None
+    length = frame_size(memoryview(buffer)[offset:offset + FRAME_HEADER.size])
+    if len(buffer) - offset < length:
+        return None
+    return length
+
+def decode_batch(buffer):
+    """
+    Toplu istek gövdesini raporlara ayır; örnekler kopyalanmadan
+    np.frombuffer ile gövde üzerinde görünüm olarak döndürülür
+    
+    Args:
+        buffer: bytes, bytearray veya memoryview
+    
+    Returns:
+        list: [{'sensor_id', 'timestamp', 'gps', 'audio_data'}, ...]; sürüm 2
+        çerçevelerde ek bilgi alanları da rapora eklenir
+    """
+    buffer = memoryview(buffer)
+    reports = []
+    offset = 0
+    while offset < len(buffer):
+        if len(buffer) - offset < FRAME_HEADER.size:
+            raise ValueError("Eksik çerçeve başlığı")
+        (magic, version, encoding, id_length,
+         timestamp, lat, lon, data_length) = FRAME_HEADER.unpack_from(buffer, offset)
+        if magic != FRAME_MAGIC or version not in (FRAME_VERSION, FRAME_VERSION_METADATA):
+            raise ValueError("Geçersiz çerçeve başlığı")
+        if encoding not in (ENCODING_FLOAT32, ENCODING_SNIPPET):
+            raise ValueError(f"Desteklenmeyen örnek kodlaması: {encoding}")
+        
+        offset += FRAME_HEADER.size
+        end = offset + id_length + data_length
+        if end > len(buffer):
+            raise ValueError("Eksik çerçeve verisi")
+        
+        sensor_id = bytes(buffer[offset:offset + id_length]).decode('utf-8')
+        offset += id_length
+        report = {
+            'sensor_id': sensor_id,
+            'timestamp': timestamp,
+            'gps': (lat, lon)
+        }
+        if version == FRAME_VERSION_METADATA:
+            offset = decode_metadata(buffer, offset, end, report)
+        if encoding == ENCODING_SNIPPET:
+            report.update(decode_snippet_payload(buffer[offset:end]))
+        else:
+            report['audio_data'] = np.frombuffer(buffer, dtype='<f4', count=(end - offset) // 4, offset=offset)
+        offset = end
+        
+        reports.append(report)
+    return reports
+
+def decode_metadata(buffer, offset, end, report):
+    """
+    Sürüm 2 çerçevedeki ek bilgi bölümünü çöz ve bilinen alanları rapora ekle
+    
+    Returns:
+        Örnek verisinin başladığı konum
+    """
+    if end - offset < METADATA_LENGTH.size:
+        raise ValueError("Eksik ek bilgi bölümü")
+    (length,) = METADATA_LENGTH.unpack_from(buffer, offset)
+    offset += METADATA_LENGTH.size
+    if end - offset < length:
+        raise ValueError("Eksik ek bilgi bölümü")
+    try:
+        metadata = json.loads(bytes(buffer[offset:offset + length]).decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Geçersiz ek bilgi bölümü")
+    if not isinstance(metadata, dict):
+        raise ValueError("Geçersiz ek bilgi bölümü")
+    # Bilinmeyen alanlar yeni sensör sürümleriyle uyum için yok sayılır
+    report.update({field: metadata[field] for field in METADATA_FIELDS if field in metadata})
+    return offset + length
+
+def decode_snippet_payload(payload, chunk_size=16384):
+    """
+    Sıkıştırılmış ses kesitini parça parça çözerek rapor alanlarını üret
+    
+    Returns:
+        dict: audio_snippet (saklama için sıkıştırılmış bayt), audio_data
+        (float32), sample_rate ve onset_index
+    """
+    decoder = SnippetDecoder()
+    for start in range(0, len(payload), chunk_size):
+        decoder.feed(payload[start:start + chunk_size])
+    return {
+        'audio_snippet': bytes(payload),
+        'audio_data': dequantize(decoder.finish()),
+        'sample_rate': decoder.sample_rate,
+        'onset_index': decoder.onset_index
+    }
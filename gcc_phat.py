@@ -0,0 +1,134 @@
+import numpy as np
+import scipy.fft
+
+def snippet_spectra(snippets, nfft):
+    """
+    Her kesitin rfft'si bir kez hesaplanır: (sensör, frekans)
+    
+    PHAT ağırlığı |X_i X_j*| = |X_i| |X_j| olduğundan genlik normalizasyonu
+    çiftler yerine burada, sensör başına bir kez yapılır.
+    """
+    frames = np.zeros((len(snippets), nfft), dtype=np.float32)
+    for index, snippet in enumerate(snippets):
+        frames[index, :len(snippet)] = snippet
+    spectra = scipy.fft.rfft(frames, axis=1)
+    return spectra / np.maximum(np.abs(spectra), 1e-12)
+
+def neighbor_pairs(order, neighbors):
+    """
+    Varış sırasında her sensörü kendisinden sonraki en fazla neighbors
+    sensörle eşle; sensör sayısı neighbors + 1'i aşmıyorsa tüm çiftler döner
+    """
+    first, second = np.triu_indices(len(order), k=1)
+    keep = second - first <= neighbors
+    return order[first[keep]], order[second[keep]]
+
+def pairwise_delays(spectra, first, second, expected, max_lag, nfft):
+    """
+    Önbelleğe alınmış spektrumlardan verilen sensör çiftleri için GCC-PHAT gecikmesi
+    
+    Args:
+        spectra: snippet_spectra çıktısı (sensör, frekans)
+        first, second: Çift indeksleri
+        expected: (sensör,) kaba gecikme tahmini (örnek); arama bunun etrafında yapılır
+        max_lag: Kaba tahmine göre aranacak en büyük düzeltme (örnek)
+        nfft: FFT uzunluğu
+    
+    Returns:
+        tau_ij = d_i - d_j (kesirli örnek) ve tepe yükseklikleri (0-1 arası güven)
+    """
+    # Tüm çiftlerin çapraz spektrumları ve ters dönüşümleri tek işlemde
+    cross = spectra[first] * np.conj(spectra[second])
+    correlation = scipy.fft.irfft(cross, n=nfft, axis=1)
+    
+    center = np.round(expected[first] - expected[second]).astype(np.int64)
+    offsets = np.arange(-max_lag - 1, max_lag + 2)
+    lags = center[:, None] + offsets[None, :]
+    values = np.take_along_axis(correlation, lags % nfft, axis=1)
+    # Pencere kenarları yalnızca parabolik ara değerlemede komşu olarak kullanılır
+    peak = np.argmax(values[:, 1:-1], axis=1) + 1
+    rows = np.arange(len(peak))
+    left, middle, right = values[rows, peak - 1], values[rows, peak], values[rows, peak + 1]
+    denominator = left - 2 * middle + right
+    denominator = np.where(np.abs(denominator) > 1e-12, denominator, np.inf)
+    shift = 0.5 * (left - right) / denominator
+    tau = lags[rows, peak] + np.clip(shift, -0.5, 0.5)
+    return tau, np.clip(middle, 0.0, 1.0)
+
+def is_connected(first, second, count):
+    """Çiftlerin oluşturduğu çizge tüm sensörleri birbirine bağlıyor mu"""
+    adjacency = np.eye(count, dtype=bool)
+    adjacency[first, second] = True
+    adjacency[second, first] = True
+    reached = adjacency[0]
+    for _ in range(count):
+        expanded = adjacency[reached].any(axis=0)
+        if (expanded == reached).all():
+            break
+        reached = expanded
+    return bool(reached.all())
+
+def solve_delays(first, second, tau, weights, anchor):
+    """
+    Çift gecikmelerinden sensör başına gecikmeleri ağırlıklı en küçük
+    kareler ile çöz; ortalama anchor ortalamasına sabitlenir
+    """
+    count = len(anchor)
+    matrix = np.zeros((len(tau) + 1, count))
+    rows = np.arange(len(tau))
+    matrix[rows, first] = 1.0
+    matrix[rows, second] = -1.0
+    matrix[-1] = 1.0 / count
+    target = np.append(tau, np.mean(anchor))
+    sqrt_weights = np.sqrt(np.append(weights, 1.0))
+    solution, *_ = np.linalg.lstsq(matrix * sqrt_weights[:, None], target * sqrt_weights, rcond=None)
+    return solution
+
+def refine_arrival_times(reports, max_correction=0.005, min_confidence=0.1, neighbors=8):
+    """
+    Aynı olaya ait raporların ses kesitlerinden GCC-PHAT ile varış
+    zamanlarını iyileştir
+    
+    Her kesitin rfft'si bir kez alınır; çiftlerin ilintisi bu
+    spektrumlardan tek toplu işlemle çıkarılır. Küçük gruplarda tüm
+    çiftler, büyük gruplarda her sensör varış sırasındaki en fazla
+    neighbors komşusuyla eşlenir; böylece ters dönüşüm sayısı sensör
+    sayısıyla doğrusal artar. Çift gecikmeleri tepe yüksekliğiyle
+    ağırlıklandırılıp sensör başına gecikmelere çözülür.
+    
+    Args:
+        reports: audio_data, sample_rate, onset_index ve timestamp içeren raporlar
+        max_correction: Sensörün bildirdiği başlangıç anına göre en büyük düzeltme (saniye)
+        min_confidence: Bu değerin altındaki tepeler hesaba katılmaz
+        neighbors: Büyük gruplarda sensör başına eşlenecek en fazla komşu sayısı
+    
+    Returns:
+        Rapor başına iyileştirilmiş varış zamanları veya kesitler uygun değilse None
+    """
+    if len(reports) < 2 or any(report.get('audio_data') is None for report in reports):
+        return None
+    sample_rates = {report.get('sample_rate') for report in reports}
+    if len(sample_rates) != 1 or None in sample_rates:
+        return None
+    sample_rate = sample_rates.pop()
+    
+    snippets = [np.asarray(report['audio_data'], dtype=np.float32) for report in reports]
+    onsets = np.array([report.get('onset_index') or 0 for report in reports], dtype=float)
+    max_lag = int(np.ceil(max_correction * sample_rate))
+    # Dairesel ilintide örtüşme olmaması için en uzun kesitin iki katı + arama penceresi
+    nfft = 1 << int(np.ceil(np.log2(2 * max(len(snippet) for snippet in snippets) + max_lag)))
+    
+    timestamps = np.array([report['timestamp'] for report in reports], dtype=float)
+    spectra = snippet_spectra(snippets, nfft)
+    first, second = neighbor_pairs(np.argsort(timestamps), neighbors)
+    tau, confidence = pairwise_delays(spectra, first, second, onsets, max_lag, nfft)
+    usable = confidence >= min_confidence
+    if not usable.any():
+        return None
+    # Güvenilir çiftler tüm sensörleri birbirine bağlamıyorsa kaba zamanlar kullanılır
+    if not is_connected(first[usable], second[usable], len(reports)):
+        return None
+    delays = solve_delays(first[usable], second[usable], tau[usable], confidence[usable], onsets)
+    
+    # Varış = kesit başlangıcı + gecikme; kesit başlangıcı = timestamp - onset_index / sample_rate
+    return timestamps + (delays - onsets) / sample_rate
@@ -0,0 +1,88 @@
+import time
+import threading
+from collections import Counter
+from spatial import geohash_encode, geohash_bounds
+
+class HeatmapAggregator:
+    def __init__(self, precisions=(4, 5, 6, 7), bucket_seconds=3600, retention_hours=24 * 30):
+        """
+        Olay yoğunluğunu geohash hücresi ve saat başına sayan artımlı özet
+        
+        Her olay tüm çözünürlük seviyelerindeki hücresine eklenir; ısı
+        haritası sorguları olaylar yerine yalnızca hücre sayaçlarını okur.
+        
+        Args:
+            precisions: Tutulan geohash uzunlukları (kaba -> ince piramit)
+            bucket_seconds: Zaman dilimi uzunluğu (saniye)
+            retention_hours: Bu süreden eski dilimler atılır
+        """
+        self.precisions = tuple(sorted(precisions))
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention_hours * 3600
+        self.buckets = {}
+        self.lock = threading.Lock()
+    
+    def add(self, timestamp, lat, lon):
+        bucket = int(timestamp // self.bucket_seconds)
+        # En ince hücrenin önekleri daha kaba seviyelerin hücreleridir
+        cell = geohash_encode(lat, lon, self.precisions[-1])
+        with self.lock:
+            counters = self.buckets.get(bucket)
+            if counters is None:
+                counters = self.buckets[bucket] = {precision: Counter() for precision in self.precisions}
+                self.evict(timestamp)
+            for precision in self.precisions:
+                counters[precision][cell[:precision]] += 1
+    
+    def load(self, events):
+        """Depodaki olaylardan özeti yeniden kur (sunucu açılışında)"""
+        count = 0
+        for event in events:
+            lat, lon = event['location']
+            self.add(event['timestamp'], lat, lon)
+            count += 1
+        return count
+    
+    def evict(self, now=None):
+        oldest = int(((now or time.time()) - self.retention) // self.bucket_seconds)
+        for bucket in [bucket for bucket in self.buckets if bucket < oldest]:
+            del self.buckets[bucket]
+    
+    def cells(self, start, end, precision, area=None):
+        """
+        start ile end arasındaki olay sayıları
+        
+        Args:
+            start, end: Epoch zamanları; bu zamanları içeren dilimler de sayılır
+            precision: Geohash uzunluğu (precisions içinde olmalı)
+            area: İsteğe bağlı spatial alan; sınırlarıyla kesişen hücreler döner
+        
+        Returns:
+            [{'geohash', 'lat', 'lon', 'bounds', 'count'}, ...] sayıya göre azalan
+        """
+        if precision not in self.precisions:
+            raise ValueError(f"Desteklenmeyen çözünürlük: {precision}")
+        first = int(start // self.bucket_seconds)
+        last = int(end // self.bucket_seconds)
+        total = Counter()
+        with self.lock:
+            for bucket, counters in self.buckets.items():
+                if first <= bucket <= last:
+                    total.update(counters[precision])
+        
+        if area is not None:
+            min_lat, min_lon, max_lat, max_lon = area.bounds()
+        result = []
+        for cell, count in total.most_common():
+            bounds = geohash_bounds(cell)
+            if area is not None and (bounds[0] > max_lat or bounds[2] < min_lat or
+                                     bounds[1] > max_lon or bounds[3] < min_lon):
+                continue
+            result.append({
+                'geohash': cell,
+                'lat': (bounds[0] + bounds[2]) / 2,
+                'lon': (bounds[1] + bounds[3]) / 2,
+                'bounds': list(bounds),
+                'count': count
+            })
+        return result
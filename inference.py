@@ -0,0 +1,100 @@
+import time
+import queue
+import logging
+import threading
+import numpy as np
+import tensorflow as tf
+import tracing
+
+class BatchedInference:
+    def __init__(self, model, callback, max_batch=16, max_latency=0.05):
+        """
+        Aday pencerelerin öznitelik vektörlerini toplayıp modeli tek
+        çağrıda çalıştıran çıkarım aşaması
+        
+        Kuyruğa alınan ilk adaydan itibaren max_latency saniye içinde gelen
+        adaylar (en fazla max_batch) birlikte sınıflandırılır. Model,
+        Keras predict yerine derlenmiş tek bir grafik olarak çağrılır.
+        
+        Args:
+            model: Keras modeli
+            callback: Her toplu çağrıdan sonra [(timestamp, confidence, context), ...]
+                listesiyle çağrılır; çok kanallı adaylar için confidence kanal
+                başına dizidir
+            max_batch: Tek çağrıdaki en fazla pencere sayısı
+            max_latency: Bir adayın sınıflandırılmadan önce en fazla bekleme süresi (saniye)
+        """
+        self.model = model
+        self.callback = callback
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.logger = logging.getLogger(__name__)
+        # Değişen toplu boyutlar için grafik yeniden izlenmez
+        self.predict_fn = tf.function(lambda batch: self.model(batch, training=False), reduce_retracing=True)
+        
+        self.candidates = queue.Queue()
+        self.batches = 0
+        self.windows = 0
+        self.running = True
+        self.inference_thread = threading.Thread(target=self.run)
+        self.inference_thread.daemon = True
+        self.inference_thread.start()
+    
+    def submit(self, feature_vector, timestamp, context=None):
+        """
+        Pencereyi sınıflandırma kuyruğuna al (model çağrısını beklemeden döner)
+        
+        Args:
+            feature_vector: (öznitelik,) veya kanal başına (kanal, öznitelik)
+        """
+        self.candidates.put((np.asarray(feature_vector, dtype=np.float32), timestamp, context))
+    
+    def predict(self, feature_vectors):
+        """Öznitelik vektörleri (pencere, öznitelik) için güven değerleri"""
+        batch = tf.convert_to_tensor(np.asarray(feature_vectors, dtype=np.float32))
+        return self.predict_fn(batch).numpy()[:, 0]
+    
+    def close(self, timeout=5.0):
+        self.running = False
+        self.inference_thread.join(timeout)
+    
+    def run(self):
+        while self.running or not self.candidates.empty():
+            candidates = self.collect_batch()
+            if not candidates:
+                continue
+            # Tüm adayların tüm kanalları tek çağrıda sınıflandırılır
+            rows = [np.atleast_2d(vector) for vector, _, _ in candidates]
+            try:
+                with tracing.span('predict', windows=len(rows)):
+                    confidences = self.predict(np.concatenate(rows))
+            except Exception as e:
+                self.logger.error(f"Çıkarım başarısız: {str(e)}")
+                continue
+            self.batches += 1
+            self.windows += len(confidences)
+            results = []
+            start = 0
+            for (vector, timestamp, context), row in zip(candidates, rows):
+                confidence = confidences[start:start + len(row)]
+                start += len(row)
+                results.append((timestamp, float(confidence[0]) if vector.ndim == 1 else confidence, context))
+            with tracing.span('handle_predictions'):
+                self.callback(results)
+    
+    def collect_batch(self):
+        # İlk adayı bekle, ardından gecikme sınırına kadar gelenleri ekle
+        try:
+            candidates = [self.candidates.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.max_latency
+        while len(candidates) < self.max_batch:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                candidates.append(self.candidates.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return candidates
@@ -0,0 +1,204 @@
+import bisect
+import math
+import threading
+import time
+
+# Prometheus metin biçimi
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Gecikme histogramları için varsayılan kova sınırları (saniye)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Bu kadar iş parçacığı parçası birikince sonlanmış olanlar birleştirilir
+MAX_SHARDS = 64
+
+class Metric:
+    type_name = 'untyped'
+    
+    def __init__(self, name, help_text, width=1):
+        """
+        İş parçacığı başına biriktirilen ölçü
+        
+        Her iş parçacığı yalnızca kendi değer listesine yazar; bu yüzden sıcak
+        yolda kilit alınmaz. Kilit yalnızca bir iş parçacığının ilk yazımında ve
+        değerler okunurken kullanılır. Sonlanan iş parçacıklarının değerleri tek
+        bir toplamda birleştirilir (istek başına iş parçacığı açan sunucular için).
+        
+        Args:
+            name: Ölçü adı
+            help_text: # HELP satırındaki açıklama
+            width: İş parçacığı başına tutulan değer sayısı
+        """
+        self.name = name
+        self.help = help_text
+        self.width = width
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.shards = []
+        self.retired = [0.0] * width
+        self.function = None
+    
+    def shard(self):
+        try:
+            return self.local.values
+        except AttributeError:
+            values = [0.0] * self.width
+            with self.lock:
+                if len(self.shards) >= MAX_SHARDS:
+                    self.retire()
+                self.shards.append((threading.current_thread(), values))
+            self.local.values = values
+            return values
+    
+    def retire(self):
+        # Sonlanan iş parçacıkları artık yazmaz; değerleri güvenle toplanabilir
+        alive = []
+        for thread, values in self.shards:
+            if thread.is_alive():
+                alive.append((thread, values))
+            else:
+                for i, value in enumerate(values):
+                    self.retired[i] += value
+        self.shards = alive
+    
+    def totals(self):
+        with self.lock:
+            self.retire()
+            totals = list(self.retired)
+            for _, values in self.shards:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return totals
+    
+    def set_function(self, function):
+        """Değeri okuma anında function() çağrısıyla hesapla (sıcak yolda maliyet yok)"""
+        self.function = function
+    
+    def samples(self):
+        """
+        Returns:
+            [(ad eki, etiketler, değer), ...]
+        """
+        if self.function is not None:
+            return [('', '', self.function())]
+        return [('', '', self.totals()[0])]
+
+class Counter(Metric):
+    type_name = 'counter'
+    
+    def inc(self, amount=1):
+        self.shard()[0] += amount
+
+class Gauge(Metric):
+    type_name = 'gauge'
+    
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text)
+        self.value = 0.0
+    
+    def set(self, value):
+        self.value = value
+    
+    def samples(self):
+        if self.function is not None:
+            return [('', '', self.function())]
+        return [('', '', self.value)]
+
+class Histogram(Metric):
+    type_name = 'histogram'
+    
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        """
+        Sabit kovalı histogram; iş parçacığı başına kova sayaçları ve toplam tutulur
+        
+        Args:
+            buckets: Artan sırada kova üst sınırları (+Inf kendiliğinden eklenir)
+        """
+        self.buckets = tuple(sorted(buckets))
+        # Kova sayaçları, +Inf kovası ve gözlemlerin toplamı
+        super().__init__(name, help_text, width=len(self.buckets) + 2)
+    
+    def observe(self, value):
+        values = self.shard()
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+    
+    def time(self):
+        """with histogram.time(): ... bloğunun süresini gözlemle"""
+        return Timer(self)
+    
+    def samples(self):
+        totals = self.totals()
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), totals):
+            cumulative += count
+            samples.append(('_bucket', f'{{le="{format_value(bound)}"}}', cumulative))
+        samples.append(('_sum', '', totals[-1]))
+        samples.append(('_count', '', cumulative))
+        return samples
+
+class Timer:
+    __slots__ = ('histogram', 'start')
+    
+    def __init__(self, histogram):
+        self.histogram = histogram
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+def format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+    
+    def register(self, metric):
+        # Aynı adla yeniden kayıt (ör. modülün tekrar yüklenmesi) mevcut ölçüyü döndürür
+        with self.lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"{metric.name} farklı türde zaten kayıtlı")
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name, help_text):
+        return self.register(Counter(name, help_text))
+    
+    def gauge(self, name, help_text):
+        return self.register(Gauge(name, help_text))
+    
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help_text, buckets))
+    
+    def render(self):
+        """Tüm ölçüleri Prometheus metin biçiminde döndür"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{labels} {format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+# Süreç genelindeki varsayılan kayıt
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render = REGISTRY.render
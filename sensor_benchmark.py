@@ -0,0 +1,142 @@
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from sensor_node import AcousticSensor, read_wav
+
+class ReplaySensor(AcousticSensor):
+    def __init__(self, model_path='gunshot_detection_model.h5', gps_coordinates=(41.015137, 28.979530), **kwargs):
+        """
+        GPS, NTP, ses kartı ve sunucu olmadan WAV kayıtlarını işleyen sensör
+        
+        Tespitler sunucuya gönderilmek yerine self.detections listesine eklenir.
+        """
+        self.model_path = model_path
+        self.fixed_coordinates = gps_coordinates
+        self.detections = []
+        super().__init__(**kwargs)
+    
+    def initialize_gps(self):
+        self.gps_coordinates = self.fixed_coordinates
+    
+    def initialize_time_sync(self):
+        self.time_offset = 0
+    
+    def create_uplink(self, server_url, spool_dir):
+        return None
+    
+    def load_model(self):
+        return tf.keras.models.load_model(self.model_path)
+    
+    def report_detection(self, window, end_time, confidence):
+        # Eşik ve kapı sayaçları AcousticSensor.handle_predictions'da işlenir
+        self.detections.append((end_time, float(np.max(confidence))))
+
+class StageTimer:
+    def __init__(self):
+        self.durations = {}
+    
+    def wrap(self, stage, function):
+        durations = self.durations.setdefault(stage, [])
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                durations.append(time.perf_counter() - start)
+        return timed
+    
+    def summary(self, bins=20):
+        """Aşama başına yüzdelikler ve logaritmik aralıklı gecikme histogramı (mikrosaniye)"""
+        result = {}
+        for stage, durations in self.durations.items():
+            if not durations:
+                continue
+            values = np.array(durations) * 1e6
+            edges = np.logspace(np.log10(max(values.min(), 0.1)), np.log10(values.max() * 1.001), bins + 1)
+            counts, edges = np.histogram(values, bins=edges)
+            result[stage] = {
+                'count': len(values),
+                'mean_us': float(values.mean()),
+                'p50_us': float(np.percentile(values, 50)),
+                'p99_us': float(np.percentile(values, 99)),
+                'max_us': float(values.max()),
+                'histogram': {'edges_us': edges.tolist(), 'counts': counts.tolist()}
+            }
+        return result
+
+def instrument(sensor, timer):
+    # Aşamalar sensörün kendi nesneleri üzerinde ölçülür; işleme yolu değişmez
+    sensor.feature_extractor.update = timer.wrap('feature_extraction', sensor.feature_extractor.update)
+    sensor.onset_gate.update = timer.wrap('gating', sensor.onset_gate.update)
+    sensor.inference.predict = timer.wrap('inference', sensor.inference.predict)
+    sensor.audio_callback = timer.wrap('chunk', sensor.audio_callback)
+
+def run_benchmark(paths, chunk_size=1024, model_path='gunshot_detection_model.h5'):
+    sample_rate, audio = read_wav(paths[0])
+    sensor = ReplaySensor(model_path=model_path, sample_rate=sample_rate, chunk_size=chunk_size,
+                          channels=audio.shape[1], sensor_id='replay')
+    timer = StageTimer()
+    instrument(sensor, timer)
+    
+    audio_seconds = 0.0
+    for path in paths:
+        rate, audio = read_wav(path)
+        audio_seconds += len(audio) / rate
+    
+    chunks = 0
+    start = time.perf_counter()
+    for path in paths:
+        chunks += sensor.replay(path)
+    # Kuyrukta kalan adayların sınıflandırılmasını bekle
+    sensor.inference.close()
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'files': list(paths),
+        'sample_rate': sample_rate,
+        'channels': sensor.channels,
+        'chunk_size': chunk_size,
+        'chunks': chunks,
+        'audio_seconds': audio_seconds,
+        'elapsed_seconds': elapsed,
+        'chunks_per_second': chunks / elapsed,
+        'real_time_factor': audio_seconds / elapsed,
+        'detections': len(sensor.detections),
+        'gate': sensor.onset_gate.stats(),
+        'inference_batches': sensor.inference.batches,
+        'stages': timer.summary()
+    }
+
+def print_report(result):
+    print(f"{result['chunks']} blok, {result['audio_seconds']:.1f} s ses, {result['elapsed_seconds']:.2f} s süre")
+    print(f"{result['chunks_per_second']:.0f} blok/s, gerçek zaman çarpanı {result['real_time_factor']:.1f}x")
+    print(f"Kapı isabet oranı {result['gate']['hit_rate']:.4f}, {result['gate']['submitted']} pencere sınıflandırıldı, "
+          f"kesinlik {result['gate']['precision']:.2f}, {result['detections']} tespit")
+    for stage, stats in result['stages'].items():
+        print(f"\n{stage}: n={stats['count']} p50={stats['p50_us']:.0f}us "
+              f"p99={stats['p99_us']:.0f}us max={stats['max_us']:.0f}us")
+        counts = stats['histogram']['counts']
+        edges = stats['histogram']['edges_us']
+        scale = 40 / max(max(counts), 1)
+        for low, count in zip(edges, counts):
+            print(f"  {low:>10.0f}us {'#' * int(np.ceil(count * scale))} {count}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sensör işleme hattını WAV kayıtlarıyla ölç')
+    parser.add_argument('wav', nargs='+', help='Aynı örnekleme hızı ve kanal sayısına sahip WAV dosyaları')
+    parser.add_argument('--chunk-size', type=int, default=1024)
+    parser.add_argument('--model', default='gunshot_detection_model.h5')
+    parser.add_argument('--json', help='Sonuçları bu dosyaya JSON olarak yaz')
+    args = parser.parse_args(argv)
+    
+    result = run_benchmark(args.wav, chunk_size=args.chunk_size, model_path=args.model)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,17 +5,147 @@ import tensorflow as tf
 from scipy.io import wavfile
 import time
 import gps
-from communication import send_data_to_server
+from communication import UplinkClient
+from snippet_codec import encode_snippet, find_onset
+from audio_stream import RingBuffer, StreamingFeatureExtractor
+from inference import BatchedInference
+import tracing
 import ntplib
-from collections import deque
+import socket
+
+DETECTION_THRESHOLD = 0.85  # High confidence threshold
+
+def read_wav(path):
+    """
+    WAV dosyasını [-1, 1] aralığında (örnek, kanal) float32 dizisi olarak oku
+    
+    Returns:
+        (örnekleme hızı, ses)
+    """
+    sample_rate, audio = wavfile.read(path)
+    if audio.dtype == np.uint8:
+        audio = (audio.astype(np.float32) - 128) / 128
+    elif np.issubdtype(audio.dtype, np.integer):
+        audio = audio.astype(np.float32) / np.iinfo(audio.dtype).max
+    return sample_rate, np.asarray(audio, dtype=np.float32).reshape(len(audio), -1)
+
+class OnsetGate:
+    def __init__(self, energy_ratio=8.0, flux_ratio=4.0, adaptation=0.02, min_energy=1e-8):
+        """
+        Sinir ağı sınıflandırıcısından önce çalışan ucuz darbe dedektörü
+        
+        Blok enerjisi ve spektral akı (ardışık STFT kareleri arasındaki
+        pozitif genlik artışı), gürültü tabanının üstel ortalamasıyla
+        karşılaştırılır; ikisi birden eşiği aşarsa blok aday sayılır.
+        STFT kareleri bloğun gerisinde kaldığından enerji, bu blok ile önceki
+        bloğun büyüğüdür. Gürültü tabanı yalnızca iki ölçüt de eşiğin altında
+        kaldığında güncellenir. Tüm değerler kanal başına dizilerdir.
+        
+        Args:
+            energy_ratio: Enerjinin gürültü tabanına oranı eşiği
+            flux_ratio: Spektral akının gürültü tabanına oranı eşiği
+            adaptation: Gürültü tabanı ortalamasının güncelleme katsayısı
+            min_energy: Sessiz ortamda tabanın alabileceği en küçük değer
+        """
+        self.energy_ratio = energy_ratio
+        self.flux_ratio = flux_ratio
+        self.adaptation = adaptation
+        self.min_energy = min_energy
+        self.energy_floor = None
+        self.flux_floor = None
+        self.previous_frame = None
+        self.previous_energy = None
+        self.blocks = 0
+        self.candidates = 0
+        self.channel_candidates = 0
+        # Sınıflandırıcıya gönderilen pencereler (bir tetik birden çok aday bloğu kapsar)
+        self.submitted = 0
+        self.confirmed = 0
+    
+    def spectral_flux(self, magnitude):
+        # magnitude: (kare, kanal, frekans)
+        if len(magnitude) == 0:
+            return np.zeros(magnitude.shape[1])
+        if self.previous_frame is None:
+            self.previous_frame = magnitude[0]
+        frames = np.concatenate([self.previous_frame[None], magnitude])
+        self.previous_frame = magnitude[-1]
+        flux = np.maximum(np.diff(frames, axis=0), 0.0).mean(axis=-1)
+        return flux.max(axis=0)
+    
+    def update(self, block, magnitude):
+        """
+        Args:
+            block: (örnek, kanal) biçiminde ses bloğu
+            magnitude: Bu blokta tamamlanan STFT karelerinin genlik spektrumları
+        
+        Returns:
+            Kanal başına aday geçici ses maskesi
+        """
+        block_energy = np.mean(np.square(block), axis=0)
+        energy = block_energy if self.previous_energy is None else np.maximum(block_energy, self.previous_energy)
+        self.previous_energy = block_energy
+        flux = self.spectral_flux(magnitude)
+        self.blocks += 1
+        if self.energy_floor is None:
+            self.energy_floor = np.maximum(energy, self.min_energy)
+            self.flux_floor = flux
+            return np.zeros(len(energy), dtype=bool)
+        
+        loud = energy > self.energy_ratio * self.energy_floor
+        sharp = flux > self.flux_ratio * self.flux_floor
+        candidate = loud & sharp
+        if candidate.any():
+            self.candidates += 1
+            self.channel_candidates += int(candidate.sum())
+        quiet = ~(loud | sharp)
+        self.energy_floor = np.where(quiet, np.maximum((1 - self.adaptation) * self.energy_floor +
+                                                       self.adaptation * energy, self.min_energy),
+                                     self.energy_floor)
+        self.flux_floor = np.where(quiet, (1 - self.adaptation) * self.flux_floor + self.adaptation * flux,
+                                   self.flux_floor)
+        return candidate
+    
+    def stats(self):
+        return {
+            'blocks': self.blocks,
+            'candidates': self.candidates,
+            'channel_candidates': self.channel_candidates,
+            'submitted': self.submitted,
+            'confirmed': self.confirmed,
+            'hit_rate': self.candidates / self.blocks if self.blocks else 0.0,
+            'precision': self.confirmed / self.submitted if self.submitted else 0.0
+        }
 
 class AcousticSensor:
-    def __init__(self, sample_rate=44100, chunk_size=1024, buffer_duration=1.0):
+    def __init__(self, sample_rate=44100, chunk_size=1024, buffer_duration=1.0, sensor_id=None,
+                 post_trigger=0.25, channels=1, server_url='http://localhost:5000', spool_dir='uplink_spool'):
+        """
+        Args:
+            channels: Mikrofon dizisindeki kanal sayısı; tespit tüm kanallarda
+                birlikte yapılır ve raporda kanal başına varış farkları gönderilir
+            post_trigger: Aday geçici sesten sonra sınıflandırmadan önce
+                beklenen süre (saniye); pencere atışın devamını da içerir
+            server_url: Merkezi sunucunun kök adresi
+            spool_dir: Bağlantı yokken raporların biriktirileceği dizin
+        """
+        self.sensor_id = sensor_id or socket.gethostname()
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
+        self.channels = channels
         self.buffer_size = int(buffer_duration * sample_rate)
-        self.audio_buffer = deque(maxlen=self.buffer_size)
+        self.audio_buffer = RingBuffer(self.buffer_size, channels)
+        # Öznitelikler her blokta yalnızca yeni STFT kareleri için güncellenir
+        self.feature_extractor = StreamingFeatureExtractor(sample_rate, self.buffer_size, channels)
+        # Pahalı sınıflandırıcı yalnızca kapının işaretlediği bloklardan sonra çalışır
+        self.onset_gate = OnsetGate()
+        self.post_trigger = int(post_trigger * sample_rate)
+        self.trigger_countdown = None
+        # Raporlar kalıcı bağlantı üzerinden gönderilir; bağlantı yokken diske biriktirilir
+        self.uplink = self.create_uplink(server_url, spool_dir)
         self.ml_model = self.load_model()
+        # Aday pencereler toplu olarak ve ses geri çağrısını bekletmeden sınıflandırılır
+        self.inference = BatchedInference(self.ml_model, self.handle_predictions)
         self.initialize_sensor()
         
     def initialize_sensor(self):
@@ -36,12 +166,31 @@ class AcousticSensor:
             self.time_offset = 0
             print("NTP sync failed, using system time")
     
+    def create_uplink(self, server_url, spool_dir):
+        return UplinkClient(server_url=server_url, spool_dir=spool_dir)
+    
     def load_model(self):
         # Load pre-trained model
         model = tf.keras.models.load_model('gunshot_detection_model.h5')
         return model
         
-    def extract_features(self, audio_data):
+    def load_calibration(self, path='feature_calibration.npz'):
+        # Öznitelik normalizasyonu için eğitim kümesinin ortalama ve standart sapmaları
+        try:
+            calibration = np.load(path)
+            self.feature_means = calibration['means']
+            self.feature_stds = calibration['stds']
+        except OSError:
+            print("Calibration file not found, features are not normalized")
+            self.feature_means = 0.0
+            self.feature_stds = 1.0
+    
+    @tracing.traced('extract_features')
+    def extract_features(self, audio_data=None):
+        # Ses verilmezse akışlı çıkarıcının güncel öznitelikleri kullanılır
+        if audio_data is None:
+            return self.feature_extractor.features()
+        
         # Extract advanced audio features
         features = {}
         
@@ -63,31 +212,131 @@ class AcousticSensor:
         
         return features
         
-    def detect_gunshot(self, audio_data):
-        features = self.extract_features(audio_data)
+    def feature_vector(self, features):
+        # Kanal başına bir satır: (kanal, öznitelik)
         feature_vector = np.concatenate([
-            [features['rms']],
-            [features['zero_crossing_rate']],
-            features['spectral_centroid'],
-            features['spectral_bandwidth'],
-            features['spectral_rolloff'],
-            features['mfccs']
-        ])
+            np.reshape(features['rms'], (-1, 1)),
+            np.reshape(features['zero_crossing_rate'], (-1, 1)),
+            np.atleast_2d(features['spectral_centroid']),
+            np.atleast_2d(features['spectral_bandwidth']),
+            np.atleast_2d(features['spectral_rolloff']),
+            np.atleast_2d(features['mfccs'])
+        ], axis=1)
         
         # Normalize features
-        feature_vector = (feature_vector - self.feature_means) / self.feature_stds
+        return (feature_vector - self.feature_means) / self.feature_stds
+    
+    def detect_gunshot(self, audio_data=None):
+        feature_vector = self.feature_vector(self.extract_features(audio_data))
         
         # Make prediction
-        prediction = self.ml_model.predict(feature_vector.reshape(1, -1))
-        confidence = prediction[0][0]
+        confidence = self.inference.predict(feature_vector).max()
+        
+        return confidence > DETECTION_THRESHOLD
+        
+    @tracing.traced('audio_callback')
+    def audio_callback(self, indata, frames, time_info, status):
+        # indata: (örnek, kanal); tüm kanallar tek geçişte işlenir
+        if status:
+            # Ses kartı taşmaları trace'te aşama süreleriyle yan yana görünür
+            tracing.instant('audio_status', status=str(status))
+        self.audio_buffer.write(indata)
+        with tracing.span('stft'):
+            magnitude = self.feature_extractor.update(indata)
+        with tracing.span('onset_gate'):
+            candidate = self.onset_gate.update(indata, magnitude)
+        if candidate.any() and self.trigger_countdown is None:
+            self.trigger_countdown = self.post_trigger
+        if self.trigger_countdown is None:
+            return
+        
+        self.trigger_countdown -= len(indata)
+        if self.trigger_countdown > 0 or len(self.audio_buffer) < self.buffer_size:
+            return
+        self.trigger_countdown = None
+        # Arabellek yazılmaya devam ettiğinden pencere sınıflandırma için kopyalanır
+        window = np.array(self.audio_buffer.window())
+        end_time = time.time() + self.time_offset
+        self.onset_gate.submitted += 1
+        self.inference.submit(self.feature_vector(self.extract_features()), end_time, window)
+    
+    def handle_predictions(self, results):
+        # Çıkarım iş parçacığından pencere başına (bitiş zamanı, güven, ses) ile çağrılır
+        for end_time, confidence, window in results:
+            if np.max(confidence) > DETECTION_THRESHOLD:
+                self.onset_gate.confirmed += 1
+                self.report_detection(window, end_time, confidence)
+    
+    def report_detection(self, window, end_time, confidence):
+        self.uplink.send(self.build_report(window, end_time=end_time))
+    
+    @tracing.traced('build_report')
+    def build_report(self, audio_data, onset_index=None, end_time=None):
+        """
+        Tespit edilen atış için sunucuya gönderilecek raporu hazırla; ses,
+        başlangıç etrafında kırpılmış ve sıkıştırılmış kesit olarak eklenir
         
-        return confidence > 0.85  # High confidence threshold
+        Çok kanallı seste kesit, atışın en erken ulaştığı kanaldan alınır;
+        diğer kanalların bu kanala göre varış farkları (saniye) yerel yön
+        kestirimi için rapora eklenir.
         
+        Args:
+            audio_data: (örnek,) veya (örnek, kanal) ses penceresi
+            end_time: Arabelleğin son örneğinin (düzeltilmiş) zamanı; verilmezse şimdi
+        """
+        audio_data = np.asarray(audio_data)
+        channel_offsets = [0.0]
+        if audio_data.ndim == 2:
+            onsets = find_onset(audio_data)
+            channel = int(np.argmin(onsets))
+            channel_offsets = ((onsets - onsets[channel]) / self.sample_rate).tolist()
+            audio_data = audio_data[:, channel]
+            if onset_index is None:
+                onset_index = int(onsets[channel])
+        if onset_index is None:
+            onset_index = find_onset(audio_data)
+        if end_time is None:
+            end_time = time.time() + self.time_offset
+        # Zaman damgası, arabelleğin son örneğinden geriye doğru başlangıç anına karşılık gelir
+        onset_time = end_time - (len(audio_data) - onset_index) / self.sample_rate
+        return {
+            'timestamp': onset_time,
+            'gps': self.gps_coordinates,
+            'audio_snippet': encode_snippet(audio_data, self.sample_rate, onset_index),
+            'sensor_id': self.sensor_id,
+            'channel_offsets': channel_offsets,
+            'gate_stats': self.onset_gate.stats()
+        }
+    
+    def replay(self, path):
+        """
+        WAV dosyasını start_monitoring ile aynı blok yolundan, gerçek
+        zamanı beklemeden işle
+        
+        Returns:
+            İşlenen blok sayısı
+        """
+        sample_rate, audio = read_wav(path)
+        if sample_rate != self.sample_rate or audio.shape[1] != self.channels:
+            raise ValueError(f"{path}: {sample_rate} Hz / {audio.shape[1]} kanal, "
+                             f"sensör {self.sample_rate} Hz / {self.channels} kanal")
+        blocks = 0
+        for start in range(0, len(audio), self.chunk_size):
+            block = audio[start:start + self.chunk_size]
+            self.audio_callback(block, len(block), None, None)
+            blocks += 1
+        return blocks
+    
     def start_monitoring(self):
         with sd.InputStream(callback=self.audio_callback,
-                          channels=1,
+                          channels=self.channels,
                           samplerate=self.sample_rate,
                           blocksize=self.chunk_size):
             print("Ses izleme başladı...")
-            while True:
-                time.sleep(0.1) 
\ No newline at end of file
+            try:
+                while True:
+                    time.sleep(0.1)
+            finally:
+                # Bekleyen tespitleri sınıflandır; gönderilemeyen raporları diske yaz
+                self.inference.close()
+                self.uplink.close()
\ No newline at end of file
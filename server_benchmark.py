@@ -0,0 +1,193 @@
+import sys
+import json
+import time
+import heapq
+import random
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+from geopy.distance import geodesic
+import central_server
+from central_server import GunShotDetectionServer
+from database import set_event_store
+from event_log import EventLog
+from simulation import random_location, synthesize_reports
+
+class BenchmarkServer(GunShotDetectionServer):
+    def __init__(self, **kwargs):
+        """Kaydedilen konumların ve uyarıların zamanını atış kimliğine göre tutan sunucu"""
+        self.stored = {}
+        self.alerted = {}
+        self.mixed_groups = 0
+        self.current = threading.local()
+        super().__init__(**kwargs)
+    
+    def record_event(self, sensor_data, source_location):
+        super().record_event(sensor_data, source_location)
+        # Grup farklı atışların raporlarını içerebilir; çoğunluk esas alınır
+        shots = Counter(data.get('shot_id') for data in sensor_data)
+        if len(shots) > 1:
+            self.mixed_groups += 1
+        shot_id = shots.most_common(1)[0][0]
+        self.current.shot_id = shot_id
+        self.stored.setdefault(shot_id, (time.perf_counter(), tuple(float(value) for value in source_location)))
+    
+    def notify_authorities(self, location):
+        # Uyarı kanalı yerine yalnızca uyarının verildiği an kaydedilir
+        self.alerted.setdefault(getattr(self.current, 'shot_id', None), time.perf_counter())
+
+def percentiles(values):
+    """Milisaniye cinsinden p50/p99/p999"""
+    if not values:
+        return {'count': 0}
+    values = np.asarray(values) * 1000
+    return {
+        'count': len(values),
+        'p50_ms': float(np.percentile(values, 50)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'p999_ms': float(np.percentile(values, 99.9)),
+        'max_ms': float(values.max())
+    }
+
+def start_server(store_dir, **server_options):
+    set_event_store(EventLog(store_dir))
+    server = BenchmarkServer(**server_options)
+    http_server = make_server('127.0.0.1', 0, central_server.app, threaded=True)
+    thread = threading.Thread(target=http_server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, http_server
+
+def schedule_reports(sensors, center, area_radius, shots, shot_rate, start_time, **report_options):
+    """Tüm atışların raporlarını varış zamanına göre sıralı bir yığın olarak üret"""
+    sources = {}
+    pending = []
+    for shot_id in range(shots):
+        source = random_location(center, area_radius)
+        event_time = start_time + shot_id / shot_rate
+        sources[shot_id] = source
+        for report in synthesize_reports(source, sensors, event_time, **report_options):
+            report['shot_id'] = shot_id
+            heapq.heappush(pending, (report['timestamp'], id(report), report))
+    return sources, pending
+
+def run_benchmark(sensor_count=2000, shots=200, shot_rate=0.5, area_radius=2000.0, hearing_range=300.0,
+                  clock_jitter=0.0005, dropout=0.05, concurrency=32, drain=5.0, seed=0, **server_options):
+    random.seed(seed)
+    center = (40.990743, 29.029734)
+    sensors = {f"sensor-{index}": random_location(center, area_radius) for index in range(sensor_count)}
+    
+    with tempfile.TemporaryDirectory() as store_dir:
+        server, http_server = start_server(store_dir, **server_options)
+        url = f"http://127.0.0.1:{http_server.server_port}/api/event"
+        sessions = threading.local()
+        post_latencies = []
+        failures = Counter()
+        last_sent = {}
+        
+        def post(report):
+            session = getattr(sessions, 'session', None)
+            if session is None:
+                session = sessions.session = requests.Session()
+            last_sent[report['shot_id']] = time.perf_counter()
+            started = time.perf_counter()
+            try:
+                response = session.post(url, json=report, timeout=30)
+                if response.status_code not in (200, 202):
+                    failures[str(response.status_code)] += 1
+            except requests.RequestException as e:
+                failures[type(e).__name__] += 1
+            post_latencies.append(time.perf_counter() - started)
+        
+        start_time = time.time() + 0.5
+        sources, pending = schedule_reports(sensors, center, area_radius, shots, shot_rate, start_time,
+                                            clock_jitter=clock_jitter, dropout=dropout,
+                                            hearing_range=hearing_range)
+        report_count = len(pending)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Raporlar sensöre ulaştıkları anda gönderilir
+            while pending:
+                arrival, _, report = heapq.heappop(pending)
+                delay = arrival - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(post, report)
+        send_elapsed = time.perf_counter() - started
+        time.sleep(drain)
+        http_server.shutdown()
+        server.shutdown()
+    
+    store_latencies = []
+    alert_latencies = []
+    errors = []
+    invalid_locations = 0
+    for shot_id, (stored_at, location) in server.stored.items():
+        if shot_id not in last_sent:
+            continue
+        store_latencies.append(stored_at - last_sent[shot_id])
+        if shot_id in server.alerted:
+            alert_latencies.append(server.alerted[shot_id] - last_sent[shot_id])
+        if not (-90 <= location[0] <= 90 and -180 <= location[1] <= 180):
+            invalid_locations += 1
+            continue
+        errors.append(geodesic(location, sources[shot_id]).meters)
+    
+    return {
+        'config': {
+            'sensors': sensor_count, 'shots': shots, 'shot_rate': shot_rate, 'area_radius': area_radius,
+            'hearing_range': hearing_range, 'clock_jitter': clock_jitter, 'dropout': dropout,
+            'concurrency': concurrency, 'seed': seed, 'server': server_options
+        },
+        'reports': report_count,
+        'failures': dict(failures),
+        'send_seconds': send_elapsed,
+        'reports_per_second': report_count / send_elapsed,
+        'shots_located': len(server.stored),
+        'shots_alerted': len(server.alerted),
+        'dropped_groups': server.dropped_groups + server.event_buffer.dropped_groups,
+        'mixed_groups': server.mixed_groups,
+        'invalid_locations': invalid_locations,
+        'post_latency': percentiles(post_latencies),
+        'store_latency': percentiles(store_latencies),
+        'alert_latency': percentiles(alert_latencies),
+        'location_error_m': {
+            'p50': float(np.percentile(errors, 50)) if errors else None,
+            'p90': float(np.percentile(errors, 90)) if errors else None
+        }
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Merkez sunucu için uçtan uca yük ve gecikme testi')
+    parser.add_argument('--sensors', type=int, default=2000)
+    parser.add_argument('--shots', type=int, default=200)
+    parser.add_argument('--shot-rate', type=float, default=0.5, help='Saniyedeki atış sayısı')
+    parser.add_argument('--area-radius', type=float, default=2000.0, help='Sensör alanı yarıçapı (metre)')
+    parser.add_argument('--hearing-range', type=float, default=300.0, help='Atışın duyulduğu mesafe (metre)')
+    parser.add_argument('--clock-jitter', type=float, default=0.0005, help='Saat sapması (saniye)')
+    parser.add_argument('--dropout', type=float, default=0.05, help='Rapor kaybolma olasılığı')
+    parser.add_argument('--concurrency', type=int, default=32, help='Eşzamanlı istek sayısı')
+    parser.add_argument('--drain', type=float, default=5.0, help='Gönderimden sonra bekleme süresi (saniye)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--async-ingestion', action='store_true')
+    parser.add_argument('--workers', type=int, default=0, help='Konum hesabı süreç sayısı')
+    parser.add_argument('--output', help='Sonuçları bu dosyaya JSON olarak yaz')
+    args = parser.parse_args(argv)
+    
+    result = run_benchmark(sensor_count=args.sensors, shots=args.shots, shot_rate=args.shot_rate,
+                           area_radius=args.area_radius, hearing_range=args.hearing_range,
+                           clock_jitter=args.clock_jitter, dropout=args.dropout,
+                           concurrency=args.concurrency, drain=args.drain, seed=args.seed,
+                           async_ingestion=args.async_ingestion, localization_workers=args.workers)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import random
+import geopy.point
+from geopy.distance import geodesic
+
+SOUND_SPEED = 343.0  # m/s
+
+def random_location(center, radius):
+    """Merkezden en fazla radius metre uzaklıkta rastgele açı ve mesafeyle seçilen konum"""
+    angle = random.uniform(0, 360)
+    distance = random.uniform(0, radius)
+    destination = geodesic(meters=distance).destination(geopy.Point(*center), angle)
+    return (destination.latitude, destination.longitude)
+
+def propagation_delay(source, sensor_position):
+    """
+    Returns:
+        (mesafe (metre), ses gecikmesi (saniye))
+    """
+    distance = geodesic(source, sensor_position).meters
+    return distance, distance / SOUND_SPEED
+
+def synthesize_reports(source, sensors, event_time, clock_jitter=0.0, dropout=0.0, hearing_range=None):
+    """
+    Bir atış için sensör raporlarını üret
+    
+    Args:
+        source: Atış konumu (lat, lon)
+        sensors: {sensor_id: (lat, lon)}
+        event_time: Atış anı (epoch)
+        clock_jitter: Sensör saatlerinin standart sapması (saniye)
+        dropout: Raporun kaybolma olasılığı
+        hearing_range: Bu mesafeden uzaktaki sensörler atışı duymaz (metre)
+    
+    Returns:
+        [{'sensor_id', 'timestamp', 'gps'}, ...] varış sırasında
+    """
+    reports = []
+    for sensor_id, position in sensors.items():
+        distance, delay = propagation_delay(source, position)
+        if hearing_range is not None and distance > hearing_range:
+            continue
+        if random.random() < dropout:
+            continue
+        reports.append({
+            'sensor_id': sensor_id,
+            'timestamp': event_time + delay + random.gauss(0, clock_jitter),
+            'gps': position
+        })
+    return sorted(reports, key=lambda report: report['timestamp'])
@@ -0,0 +1,171 @@
+import struct
+import zlib
+import numpy as np
+
+# Ses kesiti kodlaması:
+#   magic (4s) | sürüm (B) | örnekleme hızı (I) | örnek sayısı (I) | başlangıç indeksi (I)
+# ardından int16 örneklerin zigzag kodlanmış farklarının (delta) zlib ile
+# sıkıştırılmış hali gelir. Nicemlenmiş (int16) sinyal kayıpsız geri elde edilir.
+SNIPPET_MAGIC = b'GSN1'
+SNIPPET_VERSION = 1
+SNIPPET_HEADER = struct.Struct('<4sBIII')
+
+FULL_SCALE = 32767
+
+# Çözücünün kabul ettiği sınırlar; başlık alanları güvenilmeyen girdidir
+MAX_SAMPLE_RATE = 192000
+MAX_SNIPPET_SECONDS = 10.0
+
+def find_onset(audio_data, threshold=0.3):
+    """
+    Zarfın tepe değerinin threshold katını ilk aşan örneğin indeksi;
+    (örnek, kanal) biçimindeki ses için kanal başına indeks dizisi
+    """
+    envelope = np.abs(np.asarray(audio_data, dtype=np.float32))
+    if len(envelope) == 0:
+        return 0 if envelope.ndim == 1 else np.zeros(envelope.shape[1:], dtype=np.int64)
+    onsets = np.argmax(envelope >= threshold * envelope.max(axis=0), axis=0)
+    return int(onsets) if envelope.ndim == 1 else onsets
+
+def trim_snippet(audio_data, sample_rate, onset_index=None, pre_onset=0.02, post_onset=0.25):
+    """
+    Sesi başlangıç (onset) etrafında kırp
+    
+    Args:
+        audio_data: Ses örnekleri
+        sample_rate: Örnekleme hızı (Hz)
+        onset_index: Tespit edilen başlangıç indeksi; verilmezse enerji zarfından bulunur
+        pre_onset: Başlangıçtan önce tutulacak süre (saniye)
+        post_onset: Başlangıçtan sonra tutulacak süre (saniye)
+    
+    Returns:
+        (kırpılmış örnekler, kesit içindeki başlangıç indeksi)
+    """
+    audio_data = np.asarray(audio_data, dtype=np.float32)
+    if onset_index is None:
+        onset_index = find_onset(audio_data)
+    start = max(0, onset_index - int(pre_onset * sample_rate))
+    end = min(len(audio_data), onset_index + int(post_onset * sample_rate))
+    return audio_data[start:end], onset_index - start
+
+def quantize(audio_data):
+    """[-1, 1] aralığındaki float örnekleri int16'ya nicemle"""
+    audio_data = np.asarray(audio_data, dtype=np.float32)
+    return np.round(np.clip(audio_data, -1.0, 1.0) * FULL_SCALE).astype(np.int16)
+
+def dequantize(samples):
+    return samples.astype(np.float32) / FULL_SCALE
+
+def encode_snippet(audio_data, sample_rate, onset_index=None, pre_onset=0.02, post_onset=0.25,
+                   level=6):
+    """
+    Ses kesitini kırp, int16'ya nicemle, fark + zigzag + deflate ile sıkıştır
+    
+    Args:
+        audio_data: Ses örnekleri (float, [-1, 1])
+        sample_rate: Örnekleme hızı (Hz)
+        onset_index: Tespit edilen başlangıç indeksi
+        pre_onset, post_onset: Başlangıç etrafında tutulacak süreler (saniye)
+        level: zlib sıkıştırma seviyesi
+    
+    Returns:
+        bytes
+    """
+    snippet, onset = trim_snippet(audio_data, sample_rate, onset_index, pre_onset, post_onset)
+    samples = quantize(snippet)
+    
+    # Farklar int16 aralığında sarmalanır; zigzag küçük negatifleri küçük pozitiflere eşler
+    deltas = np.diff(samples, prepend=np.int16(0)).astype(np.int16)
+    zigzag = ((deltas.astype(np.int32) << 1) ^ (deltas.astype(np.int32) >> 15)).astype('<u2')
+    
+    header = SNIPPET_HEADER.pack(SNIPPET_MAGIC, SNIPPET_VERSION, int(sample_rate), len(samples), onset)
+    return header + zlib.compress(zigzag.tobytes(), level)
+
+class SnippetDecoder:
+    def __init__(self, max_seconds=MAX_SNIPPET_SECONDS):
+        """
+        Sıkıştırılmış ses kesitini parça parça çözen akış çözücüsü; tüm
+        sıkıştırılmış veri belleğe alınmadan, geldikçe int16 diziye yazılır
+        
+        Args:
+            max_seconds: Kabul edilen en uzun kesit süresi; bellek ayırma ve
+                açılan veri miktarı buna göre sınırlanır
+        """
+        self.max_seconds = max_seconds
+        self.header = b''
+        self.sample_rate = None
+        self.onset_index = None
+        self.samples = None
+        self.position = 0
+        self.previous = 0
+        self.pending = b''
+        self.decompressor = zlib.decompressobj()
+    
+    def feed(self, data):
+        """
+        Yeni bayt parçasını çöz
+        
+        Returns:
+            Bu parçayla çözülen int16 örnekler (görünüm)
+        """
+        if self.samples is None:
+            self.header += bytes(data)
+            if len(self.header) < SNIPPET_HEADER.size:
+                return np.empty(0, dtype=np.int16)
+            magic, version, sample_rate, count, onset = SNIPPET_HEADER.unpack_from(self.header)
+            if magic != SNIPPET_MAGIC or version != SNIPPET_VERSION:
+                raise ValueError("Geçersiz ses kesiti başlığı")
+            if not 0 < sample_rate <= MAX_SAMPLE_RATE or count > self.max_seconds * sample_rate or onset > count:
+                raise ValueError("Ses kesiti başlığındaki değerler sınır dışında")
+            self.sample_rate = sample_rate
+            self.onset_index = onset
+            self.samples = np.empty(count, dtype=np.int16)
+            data = self.header[SNIPPET_HEADER.size:]
+        
+        # Açılan veri beklenen örnek sayısıyla sınırlanır (sıkıştırma bombasına karşı)
+        remaining = 2 * (len(self.samples) - self.position) - len(self.pending)
+        try:
+            inflated = self.decompressor.decompress(bytes(data), max(remaining, 0) + 1)
+        except zlib.error as e:
+            raise ValueError(f"Bozuk ses kesiti: {e}")
+        if len(inflated) > remaining:
+            raise ValueError("Ses kesiti beklenenden uzun")
+        raw = self.pending + inflated
+        usable = len(raw) - len(raw) % 2
+        self.pending = raw[usable:]
+        zigzag = np.frombuffer(raw[:usable], dtype='<u2').astype(np.int32)
+        if len(zigzag) > len(self.samples) - self.position:
+            raise ValueError("Ses kesiti beklenenden uzun")
+        
+        # Zigzag ve fark kodlamasını geri al; toplam önceki parçadan devam eder
+        deltas = ((zigzag >> 1) ^ -(zigzag & 1)).astype(np.int64)
+        values = (np.cumsum(deltas) + self.previous).astype(np.int64)
+        values = ((values + 32768) % 65536 - 32768).astype(np.int16)
+        if len(values):
+            self.previous = int(values[-1])
+        
+        start = self.position
+        self.samples[start:start + len(values)] = values
+        self.position += len(values)
+        return self.samples[start:self.position]
+    
+    def finish(self):
+        """Çözümü bitir ve tüm int16 örnekleri döndür"""
+        if self.samples is None or self.position != len(self.samples) or not self.decompressor.eof:
+            raise ValueError("Eksik ses kesiti")
+        if self.pending or self.decompressor.unused_data:
+            raise ValueError("Ses kesitinin sonunda fazladan veri")
+        return self.samples
+
+def decode_snippet(data, chunk_size=16384):
+    """
+    Ses kesitini çöz
+    
+    Returns:
+        (int16 örnekler, örnekleme hızı, başlangıç indeksi)
+    """
+    data = memoryview(data)
+    decoder = SnippetDecoder()
+    for offset in range(0, len(data), chunk_size):
+        decoder.feed(data[offset:offset + chunk_size])
+    return decoder.finish(), decoder.sample_rate, decoder.onset_index
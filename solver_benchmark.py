@@ -0,0 +1,240 @@
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from triangulation import TriangulationCalculator
+
+SENSOR_COUNTS = (3, 4, 6, 10, 25, 50, 100, 200)
+SHAPES = ('ring', 'grid', 'linear', 'clustered')
+PLACEMENTS = ('inside', 'outside')
+SOLVERS = ('lbfgs', 'lm', 'closed_form')
+CENTER = (41.015137, 28.979530)
+
+def sensor_layout(shape, count, radius, rng):
+    """
+    Yerel düzlemde (metre) sensör dizisi üret
+    
+    Args:
+        shape: 'ring', 'grid', 'linear' veya 'clustered'
+        count: Sensör sayısı
+        radius: Dizinin yaklaşık yarıçapı (metre)
+        rng: np.random.Generator
+    
+    Returns:
+        (count, 2) dizisi [(x_doğu, y_kuzey), ...]
+    """
+    if shape == 'ring':
+        angles = np.linspace(0, 2 * np.pi, count, endpoint=False) + rng.uniform(0, 2 * np.pi)
+        return radius * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+    if shape == 'grid':
+        side = int(np.ceil(np.sqrt(count)))
+        axis = np.linspace(-radius, radius, side) if side > 1 else np.zeros(1)
+        x, y = np.meshgrid(axis, axis)
+        points = np.stack([x.ravel(), y.ravel()], axis=1)
+        return points[rng.permutation(len(points))[:count]]
+    if shape == 'linear':
+        # Küçük yanal sapma olmadan TDOA ayna belirsizliği tamamen tekil olur
+        x = np.linspace(-radius, radius, count)
+        return np.stack([x, rng.normal(0, radius * 0.01, count)], axis=1)
+    if shape == 'clustered':
+        # Birbirinden uzak birkaç küçük öbek (ör. bina çatıları)
+        clusters = max(1, min(count // 3, 4))
+        angles = rng.uniform(0, 2 * np.pi, clusters)
+        centers = radius * np.stack([np.cos(angles), np.sin(angles)], axis=1)
+        members = centers[np.arange(count) % clusters]
+        return members + rng.normal(0, radius * 0.05, (count, 2))
+    raise ValueError(f"Bilinmeyen dizi şekli: {shape}")
+
+def source_position(placement, radius, rng):
+    """Dizinin içinde (yarıçapın yarısı) veya dışında (2-3 yarıçap) rastgele kaynak"""
+    angle = rng.uniform(0, 2 * np.pi)
+    if placement == 'inside':
+        distance = radius * 0.5 * np.sqrt(rng.uniform())
+    elif placement == 'outside':
+        distance = radius * rng.uniform(2.0, 3.0)
+    else:
+        raise ValueError(f"Bilinmeyen kaynak konumu: {placement}")
+    return distance * np.array([np.cos(angle), np.sin(angle)])
+
+def to_geographic(calculator, points):
+    # Yerel düzlem (metre) -> (lat, lon); CENTER etrafında
+    _, scale = calculator.to_local_plane(CENTER, np.array([CENTER]))
+    lon = CENTER[1] + points[..., 0] / scale[0]
+    lat = CENTER[0] + points[..., 1] / scale[1]
+    return np.stack([lat, lon], axis=-1)
+
+def arrival_times(calculator, sensors, source, clock_jitter, rng):
+    # Gerçek varış zamanları elipsoid üzerindeki geodezik mesafeden hesaplanır
+    _, _, distances = calculator.geod.inv(
+        np.full(len(sensors), source[1]), np.full(len(sensors), source[0]),
+        sensors[:, 1], sensors[:, 0]
+    )
+    return np.asarray(distances) / calculator.sound_speed + rng.normal(0, clock_jitter, len(sensors))
+
+def solver_input(solver, arrivals):
+    # 'lbfgs' ardışık farkları (t_i - t_i+1), diğerleri ortak referanslı varışları bekler
+    if solver == 'lbfgs':
+        return arrivals[:-1] - arrivals[1:]
+    return arrivals - arrivals.min()
+
+def run_case(solver, shape, count, placement, trials=20, repeats=3, radius=500.0, clock_jitter=1e-5, seed=0):
+    """
+    Bir matris hücresini trials kez çöz; süre olarak her çözümün repeats
+    tekrarındaki en kısa süresi alınır (zamanlayıcı gürültüsüne karşı)
+    
+    Returns:
+        {'time_ms': {...}, 'evaluations': float, 'convergence_rate': float, 'error_m': {...}}
+    """
+    calculator = TriangulationCalculator(solver=solver)
+    rng = np.random.default_rng([seed, SOLVERS.index(solver), SHAPES.index(shape), count, PLACEMENTS.index(placement)])
+    durations = []
+    evaluations = []
+    errors = []
+    converged = 0
+    for _ in range(trials):
+        sensors = to_geographic(calculator, sensor_layout(shape, count, radius, rng))
+        source = to_geographic(calculator, source_position(placement, radius, rng))
+        arrivals = arrival_times(calculator, sensors, source, clock_jitter, rng)
+        measured = solver_input(solver, arrivals)
+        
+        before = calculator.evaluations
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            try:
+                estimate = calculator.calculate_source_location(sensors, measured)
+            except ValueError:
+                estimate = None
+            best = min(best, time.perf_counter() - start)
+        durations.append(best)
+        evaluations.append((calculator.evaluations - before) / repeats)
+        
+        if estimate is None or not np.all(np.isfinite(estimate)):
+            continue
+        converged += 1
+        _, _, error = calculator.geod.inv(source[1], source[0], estimate[1], estimate[0])
+        errors.append(error)
+    
+    durations = np.array(durations) * 1000
+    return {
+        'time_ms': {
+            'p50': float(np.percentile(durations, 50)),
+            'p90': float(np.percentile(durations, 90)),
+            'mean': float(durations.mean())
+        },
+        'evaluations': float(np.mean(evaluations)),
+        'convergence_rate': converged / trials,
+        'error_m': {
+            'p50': float(np.percentile(errors, 50)) if errors else None,
+            'p90': float(np.percentile(errors, 90)) if errors else None
+        }
+    }
+
+def case_key(solver, shape, count, placement):
+    return f"{solver}/{shape}/{count}/{placement}"
+
+def run_matrix(solvers=SOLVERS, shapes=SHAPES, counts=SENSOR_COUNTS, placements=PLACEMENTS, **options):
+    results = {}
+    for solver in solvers:
+        for shape in shapes:
+            for count in counts:
+                for placement in placements:
+                    results[case_key(solver, shape, count, placement)] = run_case(
+                        solver, shape, count, placement, **options
+                    )
+    return results
+
+def find_regressions(results, baseline, time_threshold=0.25, cell_time_threshold=1.0, error_threshold=0.25,
+                     convergence_threshold=0.05, min_time=0.1, min_error=0.5):
+    """
+    Sonuçları taban çizgisiyle karşılaştır
+    
+    Args:
+        results: run_matrix çıktısı
+        baseline: Aynı biçimde önceki sonuçlar
+        time_threshold: Çözücünün tüm hücrelerdeki p50 sürelerinin geometrik ortalamasında
+            izin verilen göreli artış (tek hücre ölçümleri paylaşılan makinelerde gürültülüdür)
+        cell_time_threshold: Tek bir hücrenin p50 süresinde izin verilen göreli artış
+        error_threshold: p50 konum hatasında izin verilen göreli artış
+        convergence_threshold: Yakınsama oranında izin verilen mutlak düşüş
+        min_time: Bu değerin (milisaniye) altındaki süre artışları gürültü sayılır
+        min_error: Bu değerin (metre) altındaki hata artışları gürültü sayılır
+    
+    Returns:
+        [(hücre, ölçü, taban değer, yeni değer), ...]
+    """
+    regressions = []
+    ratios = {}
+    for key, current in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        old_time, new_time = reference['time_ms']['p50'], current['time_ms']['p50']
+        ratios.setdefault(key.split('/')[0], []).append(np.log(new_time / old_time))
+        if new_time > max(old_time * (1 + cell_time_threshold), old_time + min_time):
+            regressions.append((key, 'time_ms.p50', old_time, new_time))
+        if current['convergence_rate'] < reference['convergence_rate'] - convergence_threshold:
+            regressions.append((key, 'convergence_rate', reference['convergence_rate'], current['convergence_rate']))
+        old_error, new_error = reference['error_m']['p50'], current['error_m']['p50']
+        if (old_error is not None and new_error is not None
+                and new_error > max(old_error * (1 + error_threshold), old_error + min_error)):
+            regressions.append((key, 'error_m.p50', old_error, new_error))
+    for solver, logs in ratios.items():
+        ratio = float(np.exp(np.mean(logs)))
+        if ratio > 1 + time_threshold:
+            regressions.append((f"{solver}/*", 'time_ms.p50 oranı', 1.0, ratio))
+    return regressions
+
+def print_report(results):
+    print(f"{'hücre':<36} {'p50 ms':>9} {'değ.':>7} {'yakınsama':>10} {'p50 hata m':>11}")
+    for key, result in results.items():
+        error = result['error_m']['p50']
+        print(f"{key:<36} {result['time_ms']['p50']:>9.2f} {result['evaluations']:>7.1f} "
+              f"{result['convergence_rate']:>10.2f} {error if error is not None else float('nan'):>11.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Konum çözücüsü için sensör sayısı ve geometri matrisi ölçümü')
+    parser.add_argument('--solvers', nargs='+', default=list(SOLVERS), choices=SOLVERS)
+    parser.add_argument('--shapes', nargs='+', default=list(SHAPES), choices=SHAPES)
+    parser.add_argument('--counts', nargs='+', type=int, default=list(SENSOR_COUNTS))
+    parser.add_argument('--placements', nargs='+', default=list(PLACEMENTS), choices=PLACEMENTS)
+    parser.add_argument('--trials', type=int, default=20, help='Hücre başına çözüm sayısı')
+    parser.add_argument('--repeats', type=int, default=3, help='Süre ölçümü için çözüm tekrarı')
+    parser.add_argument('--radius', type=float, default=500.0, help='Dizi yarıçapı (metre)')
+    parser.add_argument('--clock-jitter', type=float, default=1e-5, help='Varış zamanı gürültüsü (saniye)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', help='Karşılaştırılacak taban çizgisi JSON dosyası')
+    parser.add_argument('--save-baseline', help='Sonuçları taban çizgisi olarak bu dosyaya yaz')
+    parser.add_argument('--time-threshold', type=float, default=0.25)
+    parser.add_argument('--cell-time-threshold', type=float, default=1.0)
+    parser.add_argument('--error-threshold', type=float, default=0.25)
+    parser.add_argument('--convergence-threshold', type=float, default=0.05)
+    args = parser.parse_args(argv)
+    
+    results = run_matrix(solvers=args.solvers, shapes=args.shapes, counts=args.counts,
+                         placements=args.placements, trials=args.trials,
+                         repeats=args.repeats, radius=args.radius,
+                         clock_jitter=args.clock_jitter, seed=args.seed)
+    print_report(results)
+    
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, time_threshold=args.time_threshold,
+                                       cell_time_threshold=args.cell_time_threshold,
+                                       error_threshold=args.error_threshold,
+                                       convergence_threshold=args.convergence_threshold)
+        for key, metric, old, new in regressions:
+            print(f"GERİLEME {key} {metric}: {old:.4g} -> {new:.4g}")
+        if regressions:
+            return 1
+        print("Gerileme yok")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
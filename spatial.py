@@ -0,0 +1,181 @@
+import math
+
+# Geohash base32 alfabesi
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_DECODE = {char: index for index, char in enumerate(GEOHASH_ALPHABET)}
+EARTH_RADIUS = 6371008.8  # ortalama yarıçap (metre)
+
+def geohash_encode(lat, lon, precision=7):
+    """Koordinatı verilen uzunlukta geohash metnine dönüştür"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        # Bitler boylam ve enlem için sırayla üretilir
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+def geohash_bounds(geohash):
+    """Geohash hücresinin (min_lat, min_lon, max_lat, max_lon) sınırları"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = GEOHASH_DECODE[char]
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+def geohash_cell_size(precision):
+    """Verilen uzunluktaki geohash hücresinin (enlem, boylam) boyutu (derece)"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def geohash_cover(bounds, max_precision=7, max_cells=32):
+    """
+    Sınırlayıcı kutuyu kaplayan geohash hücreleri
+    
+    En fazla max_cells hücre üreten en ince uzunluk seçilir; dönen
+    hücreler, daha ince uzunlukta indekslenmiş hücreler için önek olarak
+    kullanılabilir.
+    """
+    min_lat, min_lon, max_lat, max_lon = bounds
+    for precision in range(max_precision, 0, -1):
+        height, width = geohash_cell_size(precision)
+        rows = range(math.floor((min_lat + 90) / height), math.floor((max_lat + 90) / height) + 1)
+        cols = range(math.floor((min_lon + 180) / width), math.floor((max_lon + 180) / width) + 1)
+        if len(rows) * len(cols) <= max_cells or precision == 1:
+            break
+    cells = set()
+    for row in rows:
+        lat = min(-90 + (row + 0.5) * height, 90.0)
+        for col in cols:
+            lon = min(-180 + (col + 0.5) * width, 180.0)
+            cells.add(geohash_encode(lat, lon, precision))
+    return sorted(cells)
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """İki nokta arasındaki büyük daire mesafesi (metre)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+class BoundingBox:
+    def __init__(self, min_lat, min_lon, max_lat, max_lon):
+        if min_lat > max_lat or min_lon > max_lon:
+            raise ValueError("Geçersiz sınırlayıcı kutu")
+        self.min_lat = min_lat
+        self.min_lon = min_lon
+        self.max_lat = max_lat
+        self.max_lon = max_lon
+    
+    def bounds(self):
+        return self.min_lat, self.min_lon, self.max_lat, self.max_lon
+    
+    def contains(self, lat, lon):
+        return self.min_lat <= lat <= self.max_lat and self.min_lon <= lon <= self.max_lon
+
+class Circle:
+    def __init__(self, lat, lon, radius):
+        """
+        Args:
+            lat, lon: Merkez koordinatı
+            radius: Yarıçap (metre)
+        """
+        if radius <= 0:
+            raise ValueError("Yarıçap pozitif olmalı")
+        self.lat = lat
+        self.lon = lon
+        self.radius = radius
+    
+    def bounds(self):
+        dlat = math.degrees(self.radius / EARTH_RADIUS)
+        dlon = dlat / max(math.cos(math.radians(self.lat)), 1e-6)
+        return (max(self.lat - dlat, -90.0), max(self.lon - dlon, -180.0),
+                min(self.lat + dlat, 90.0), min(self.lon + dlon, 180.0))
+    
+    def contains(self, lat, lon):
+        return haversine_distance(self.lat, self.lon, lat, lon) <= self.radius
+
+class Polygon:
+    def __init__(self, points):
+        """
+        Args:
+            points: [(lat, lon), ...] köşe listesi; kapatılması gerekmez
+        """
+        if len(points) < 3:
+            raise ValueError("Çokgen en az üç köşe içermeli")
+        self.points = [(float(lat), float(lon)) for lat, lon in points]
+    
+    def bounds(self):
+        lats = [lat for lat, _ in self.points]
+        lons = [lon for _, lon in self.points]
+        return min(lats), min(lons), max(lats), max(lons)
+    
+    def contains(self, lat, lon):
+        # Işın atma; küçük alanlar için düzlemsel yaklaşım yeterli
+        inside = False
+        previous_lat, previous_lon = self.points[-1]
+        for point_lat, point_lon in self.points:
+            if (point_lat > lat) != (previous_lat > lat):
+                crossing = (previous_lon - point_lon) * (lat - point_lat) / (previous_lat - point_lat) + point_lon
+                if lon < crossing:
+                    inside = not inside
+            previous_lat, previous_lon = point_lat, point_lon
+        return inside
+
+def parse_area(args):
+    """
+    Sorgu parametrelerinden alan filtresi oluştur
+    
+    Desteklenen parametreler:
+        bbox=min_lat,min_lon,max_lat,max_lon
+        lat=..&lon=..&radius=metre
+        polygon=lat,lon;lat,lon;...
+    
+    Returns:
+        BoundingBox, Circle, Polygon veya filtre yoksa None
+    
+    Raises:
+        ValueError: Parametreler hatalıysa
+    """
+    if args.get('bbox'):
+        values = [float(value) for value in args['bbox'].split(',')]
+        if len(values) != 4:
+            raise ValueError("bbox dört değer içermeli")
+        return BoundingBox(*values)
+    if args.get('radius'):
+        if not args.get('lat') or not args.get('lon'):
+            raise ValueError("radius için lat ve lon gerekli")
+        return Circle(float(args['lat']), float(args['lon']), float(args['radius']))
+    if args.get('polygon'):
+        points = [tuple(float(value) for value in point.split(','))
+                  for point in args['polygon'].split(';') if point]
+        if any(len(point) != 2 for point in points):
+            raise ValueError("Çokgen köşeleri lat,lon biçiminde olmalı")
+        return Polygon(points)
+    return None
@@ -0,0 +1,174 @@
+import os
+import io
+import json
+import atexit
+import random
+import signal
+import pstats
+import cProfile
+import functools
+import itertools
+import threading
+import time
+
+# Ortam değişkenleriyle açılır; kapalıyken span() sabit bir boş bağlam döndürür
+#   GUNSHOT_TRACE=1               aşama sürelerini kaydet
+#   GUNSHOT_TRACE_BUFFER=65536    halkada tutulacak en fazla span sayısı
+#   GUNSHOT_TRACE_FILE=path       çıkışta ve SIGUSR1 ile Chrome trace JSON yaz
+#   GUNSHOT_PROFILE_RATE=0.01     en dıştaki span'lerin bu oranını cProfile ile örnekle
+#   GUNSHOT_PROFILE_FILE=path     örneklenen profili pstats dosyası olarak yaz
+enabled = os.environ.get('GUNSHOT_TRACE', '') not in ('', '0')
+trace_file = os.environ.get('GUNSHOT_TRACE_FILE')
+profile_rate = float(os.environ.get('GUNSHOT_PROFILE_RATE', 0)) if enabled else 0.0
+profile_file = os.environ.get('GUNSHOT_PROFILE_FILE', 'gunshot_profile.pstats')
+
+capacity = int(os.environ.get('GUNSHOT_TRACE_BUFFER', 65536))
+# Halka: (ad, başlangıç ns, süre ns, iş parçacığı, ek bilgi); dizin sayacı GIL altında atomik
+ring = [None] * capacity
+counter = itertools.count()
+thread_names = {}
+profile_stats = None
+profile_lock = threading.Lock()
+local = threading.local()
+
+class NullSpan:
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Span:
+    __slots__ = ('name', 'args', 'start', 'profiler')
+    
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.profiler = None
+    
+    def __enter__(self):
+        if profile_rate and not getattr(local, 'profiling', False) and random.random() < profile_rate:
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+                local.profiling = True
+            except ValueError:
+                # Bu iş parçacığında başka bir profil aracı etkin
+                self.profiler = None
+        self.start = time.perf_counter_ns()
+        return self
+    
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        if self.profiler is not None:
+            self.profiler.disable()
+            local.profiling = False
+            add_profile(self.profiler)
+        record(self.name, self.start, end - self.start, self.args)
+        return False
+
+def span(name, **args):
+    """
+    with span('aşama'): ... bloğunun süresini halkaya kaydet
+    
+    Args:
+        name: Aşama adı
+        args: Trace görüntüleyicide gösterilecek ek bilgiler
+    """
+    if not enabled:
+        return NULL_SPAN
+    return Span(name, args or None)
+
+def traced(name):
+    """Fonksiyonu span ile saran dekoratör; izleme kapalıysa fonksiyon olduğu gibi döner"""
+    def decorate(function):
+        if not enabled:
+            return function
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(name, None):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def instant(name, **args):
+    """Süresiz olay kaydet (ör. ses kartı taşması)"""
+    if enabled:
+        record(name, time.perf_counter_ns(), None, args or None)
+
+def record(name, start, duration, args):
+    thread = threading.get_ident()
+    if thread not in thread_names:
+        thread_names[thread] = threading.current_thread().name
+    ring[next(counter) % capacity] = (name, start, duration, thread, args)
+
+def add_profile(profiler):
+    global profile_stats
+    with profile_lock:
+        if profile_stats is None:
+            profile_stats = pstats.Stats(profiler, stream=io.StringIO())
+        else:
+            profile_stats.add(profiler)
+
+def spans():
+    """Halkadaki span'leri başlangıç sırasıyla döndür"""
+    return sorted((entry for entry in list(ring) if entry is not None), key=lambda entry: entry[1])
+
+def chrome_trace():
+    """
+    Halkayı Chrome trace-event biçimine dönüştür (chrome://tracing, Perfetto)
+    
+    Returns:
+        {'traceEvents': [...], 'displayTimeUnit': 'ms'}
+    """
+    pid = os.getpid()
+    events = [
+        {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread, 'args': {'name': name}}
+        for thread, name in list(thread_names.items())
+    ]
+    for name, start, duration, thread, args in spans():
+        event = {'name': name, 'cat': 'sensor', 'pid': pid, 'tid': thread, 'ts': start / 1000}
+        if duration is None:
+            event.update(ph='i', s='t')
+        else:
+            event.update(ph='X', dur=duration / 1000)
+        if args:
+            event['args'] = args
+        events.append(event)
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+def dump(path=None):
+    """
+    Halkayı Chrome trace JSON olarak, örneklenen profili pstats dosyası olarak yaz
+    
+    Args:
+        path: Trace dosyası; verilmezse GUNSHOT_TRACE_FILE
+    
+    Returns:
+        Yazılan trace dosyasının yolu veya None
+    """
+    path = path or trace_file
+    if path is None:
+        return None
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(chrome_trace(), f)
+    os.replace(temp_path, path)
+    with profile_lock:
+        if profile_stats is not None:
+            profile_stats.dump_stats(profile_file)
+    return path
+
+def install_dump_handlers():
+    # SIGUSR1 ile çalışırken, süreç sonlanırken de otomatik olarak dosyaya yaz
+    if not enabled or trace_file is None:
+        return
+    atexit.register(dump)
+    if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump())
+
+install_dump_handlers()
@@ -2,11 +2,49 @@ import numpy as np
 from scipy.optimize import minimize
 from geopy.distance import geodesic
 import pyproj
+import threading
+from collections import OrderedDict
+
+# WGS84 elipsoid parametreleri (yerel teğet düzlem projeksiyonu için)
+WGS84_A = 6378137.0
+WGS84_E2 = 6.69437999014e-3
 
 class TriangulationCalculator:
-    def __init__(self):
+    def __init__(self, solver='lbfgs', initializer='centroid', max_iterations=50, tolerance=1e-4,
+                 max_condition=1e6, closed_form_tolerance=1.0, grid_cache=None):
+        """
+        Args:
+            solver: 'lbfgs' (geodezik amaç fonksiyonu + scipy L-BFGS-B),
+                'lm' (yerel teğet düzlemde vektörel Levenberg-Marquardt) veya
+                'closed_form' (kapalı form çözüm; koşulu kötü geometrilerde 'lm' ile iyileştirilir)
+            initializer: Başlangıç noktası; 'centroid' (sensörlerin ağırlık merkezi),
+                'closed_form' (küresel kesişim en küçük kareler çözümü) veya
+                'grid' (önceden hesaplanmış varış zamanı ızgarasında kaba arama)
+            max_iterations: 'lm' çözücüsü için en fazla iterasyon sayısı
+            tolerance: 'lm' çözücüsü için adım büyüklüğü eşiği (metre)
+            max_condition: Kapalı form çözümün doğrudan kabulü için en büyük koşul sayısı
+            closed_form_tolerance: Kapalı form çözümün doğrudan kabulü için en büyük
+                mesafe farkı artığı RMS değeri (metre)
+            grid_cache: 'grid' başlangıcı için TravelTimeGridCache; verilmezse
+                varsayılan ayarlarla oluşturulur
+        """
+        if solver not in ('lbfgs', 'lm', 'closed_form'):
+            raise ValueError(f"Bilinmeyen çözücü: {solver}")
+        if initializer not in ('centroid', 'closed_form', 'grid'):
+            raise ValueError(f"Bilinmeyen başlangıç yöntemi: {initializer}")
         self.geod = pyproj.Geod(ellps='WGS84')
         self.sound_speed = 343.2  # m/s at 20°C
+        self.solver = solver
+        self.initializer = initializer
+        self.max_iterations = max_iterations
+        self.tolerance = tolerance
+        self.max_condition = max_condition
+        self.closed_form_tolerance = closed_form_tolerance
+        if grid_cache is None and initializer == 'grid':
+            grid_cache = TravelTimeGridCache()
+        self.grid_cache = grid_cache
+        # Amaç/artık fonksiyonunun toplam çağrı sayısı (ölçüm amaçlı)
+        self.evaluations = 0
         
     def calculate_source_location(self, sensor_positions, time_differences):
         """
@@ -16,7 +54,11 @@ class TriangulationCalculator:
             sensor_positions: Sensörlerin GPS koordinatları [(lat1,lon1), ...]
             time_differences: Sensörler arasındaki varış zamanı farkları [t1, t2, ...]
         """
+        if self.solver in ('lm', 'closed_form'):
+            return self.solve_local_plane(sensor_positions, time_differences)
+        
         def objective_function(x):
+            self.evaluations += 1
             lat, lon = x
             distances = []
             
@@ -44,6 +86,18 @@ class TriangulationCalculator:
         initial_lat = np.mean([pos[0] for pos in sensor_positions])
         initial_lon = np.mean([pos[1] for pos in sensor_positions])
         
+        if self.initializer in ('closed_form', 'grid'):
+            arrivals = np.asarray(time_differences, dtype=float)
+            if len(arrivals) == len(sensor_positions) - 1:
+                # Ardışık farklar (t_i - t_i+1) -> ortak referansa göre varış zamanları
+                arrivals = np.concatenate([[0.0], -np.cumsum(arrivals)])
+            if self.initializer == 'grid':
+                estimate = self.grid_search(sensor_positions, arrivals)
+            else:
+                estimate, _, _ = self.closed_form_location(sensor_positions, arrivals)
+            if np.all(np.isfinite(estimate)):
+                initial_lat, initial_lon = estimate
+        
         # Sınırları belirle
         bounds = (
             (initial_lat - 0.1, initial_lat + 0.1),  # lat bounds
@@ -61,4 +115,514 @@ class TriangulationCalculator:
         if not result.success:
             raise ValueError("Optimization failed to converge")
             
-        return result.x 
\ No newline at end of file
+        return result.x 
+    
+    def to_local_plane(self, origin, positions):
+        """
+        GPS koordinatlarını origin etrafındaki yerel doğu-kuzey düzlemine (metre) izdüşür
+        
+        Args:
+            origin: (lat, lon) referans noktası; olay başına (E, 2) da olabilir
+            positions: (N, 2) dizisi [(lat, lon), ...]; olay başına (E, N, 2) da olabilir
+        
+        Returns:
+            (..., N, 2) dizisi [(x_doğu, y_kuzey), ...] ve (..., 2) (metre/derece) ölçek çifti
+        """
+        origin = np.asarray(origin, dtype=float)
+        lat0 = np.radians(origin[..., 0])
+        sin2 = np.sin(lat0) ** 2
+        # Meridyen ve asal düşey eğrilik yarıçapları
+        meridian = WGS84_A * (1 - WGS84_E2) / (1 - WGS84_E2 * sin2) ** 1.5
+        prime_vertical = WGS84_A / np.sqrt(1 - WGS84_E2 * sin2)
+        scale = np.stack([
+            np.radians(1.0) * prime_vertical * np.cos(lat0),  # doğu: m/derece boylam
+            np.radians(1.0) * meridian                         # kuzey: m/derece enlem
+        ], axis=-1)
+        
+        positions = np.asarray(positions, dtype=float)
+        local = (positions[..., ::-1] - origin[..., None, ::-1]) * scale[..., None, :]
+        return local, scale
+    
+    def solve_local_plane(self, sensor_positions, time_differences):
+        """
+        Sensörleri bir kez yerel teğet düzleme izdüşürüp TDOA problemini
+        analitik Jacobian ile Levenberg-Marquardt kullanarak çözer
+        
+        Args:
+            sensor_positions: Sensörlerin GPS koordinatları [(lat1,lon1), ...]
+            time_differences: Her sensörün ortak bir referansa göre varış zamanı [t1, t2, ...]
+        
+        Returns:
+            np.array([lat, lon])
+        """
+        positions = np.asarray(sensor_positions, dtype=float)
+        arrivals = np.asarray(time_differences, dtype=float)
+        if len(positions) < 3 or len(arrivals) != len(positions):
+            raise ValueError("En az 3 sensör ve her sensör için bir varış zamanı gerekli")
+        
+        # Başlangıç tahmini: sensörlerin ağırlık merkezi (düzlemin orijini)
+        origin = positions.mean(axis=0)
+        sensors, scale = self.to_local_plane(origin, positions)
+        
+        # İlk sensöre göre ölçülen mesafe farkları (metre)
+        measured = (arrivals[1:] - arrivals[0]) * self.sound_speed
+        
+        point = np.zeros(2)
+        damping = 1e-3
+        
+        if self.initializer == 'grid':
+            estimate = self.grid_search(positions, arrivals)
+            point = self.to_local_plane(origin, estimate[None])[0][0]
+        elif self.initializer == 'closed_form' or self.solver == 'closed_form':
+            weights = np.ones((1, len(sensors)))
+            weights[0, 0] = 0.0
+            estimate, rms, condition = self.closed_form_local(
+                sensors[None], np.concatenate([[0.0], measured])[None], weights, np.zeros(1, dtype=int)
+            )
+            if np.all(np.isfinite(estimate[0])):
+                point = estimate[0]
+                if (self.solver == 'closed_form' and condition[0] < self.max_condition
+                        and rms[0] < self.closed_form_tolerance):
+                    lon, lat = point / scale + np.array([origin[1], origin[0]])
+                    return np.array([lat, lon])
+        
+        def residuals(p):
+            self.evaluations += 1
+            offsets = p - sensors
+            ranges = np.maximum(np.hypot(offsets[:, 0], offsets[:, 1]), 1e-9)
+            return (ranges[1:] - ranges[0]) - measured, offsets / ranges[:, None]
+        
+        residual, units = residuals(point)
+        cost = residual @ residual
+        converged = False
+        
+        for _ in range(self.max_iterations):
+            # d(r_i)/dp = u_i - u_0 (u: sensörden noktaya birim vektör)
+            jacobian = units[1:] - units[0]
+            jtj = jacobian.T @ jacobian
+            gradient = jacobian.T @ residual
+            
+            try:
+                step = -np.linalg.solve(jtj + damping * np.diag(np.diag(jtj) + 1e-12), gradient)
+            except np.linalg.LinAlgError:
+                break
+            
+            candidate = point + step
+            candidate_residual, candidate_units = residuals(candidate)
+            candidate_cost = candidate_residual @ candidate_residual
+            
+            if candidate_cost < cost:
+                point, residual, units, cost = candidate, candidate_residual, candidate_units, candidate_cost
+                damping = max(damping / 10.0, 1e-9)
+                if np.hypot(step[0], step[1]) < self.tolerance:
+                    converged = True
+                    break
+            else:
+                damping *= 10.0
+                if damping > 1e9:
+                    # Daha fazla iyileşme yok: yerel minimumdayız
+                    converged = np.hypot(gradient[0], gradient[1]) < 1e-6 * max(cost, 1.0)
+                    break
+        
+        if not converged or not np.all(np.isfinite(point)):
+            raise ValueError("Optimization failed to converge")
+        
+        lon, lat = point / scale + np.array([origin[1], origin[0]])
+        return np.array([lat, lon])
+
+    def calculate_source_locations_batch(self, sensor_positions, time_differences, mask=None):
+        """
+        Çok sayıda olayı tek çağrıda, olaylar boyunca vektörel
+        Levenberg-Marquardt iterasyonlarıyla çözer (çevrimdışı yeniden işleme için)
+        
+        Args:
+            sensor_positions: (E, S, 2) dizisi; her olayın sensör GPS koordinatları
+            time_differences: (E, S) dizisi; her sensörün olay içi varış zamanı farkı
+            mask: (E, S) bool dizisi; olaya katılan sensörler. Verilmezse sonlu
+                (NaN olmayan) zaman ve konumlar kullanılır
+        
+        Returns:
+            (locations, converged): (E, 2) [lat, lon] dizisi (yakınsamayan olaylar NaN)
+            ve (E,) bool yakınsama bayrakları
+        """
+        positions = np.asarray(sensor_positions, dtype=float)
+        arrivals = np.asarray(time_differences, dtype=float)
+        if mask is None:
+            mask = np.isfinite(arrivals) & np.isfinite(positions).all(axis=-1)
+        mask = np.asarray(mask, dtype=bool)
+        
+        n_events = len(positions)
+        rows = np.arange(n_events)
+        counts = mask.sum(axis=1)
+        
+        # Kullanılmayan sensör yuvalarını sıfırla, olay başına ağırlık merkezini orijin al
+        positions = np.where(mask[..., None], positions, 0.0)
+        arrivals = np.where(mask, arrivals, 0.0)
+        origin = positions.sum(axis=1) / np.maximum(counts, 1)[:, None]
+        origin[counts == 0] = 0.0
+        sensors, scale = self.to_local_plane(origin, positions)
+        sensors = np.where(mask[..., None], sensors, 0.0)
+        
+        # Her olayın ilk geçerli sensörü referans; referans ve boş yuvalar artığa katılmaz
+        ref = np.argmax(mask, axis=1)
+        weights = mask.astype(float)
+        weights[rows, ref] = 0.0
+        measured = (arrivals - arrivals[rows, ref][:, None]) * self.sound_speed
+        
+        def residuals(idx, points):
+            offsets = points[:, None, :] - sensors[idx]
+            ranges = np.maximum(np.hypot(offsets[..., 0], offsets[..., 1]), 1e-9)
+            ref_ranges = ranges[np.arange(len(idx)), ref[idx]][:, None]
+            residual = ((ranges - ref_ranges) - measured[idx]) * weights[idx]
+            return residual, offsets / ranges[..., None]
+        
+        points = np.zeros((n_events, 2))
+        damping = np.full(n_events, 1e-3)
+        converged = np.zeros(n_events, dtype=bool)
+        solvable = counts >= 3
+        
+        if self.initializer == 'grid':
+            estimates = np.zeros((n_events, 2))
+            for i in np.flatnonzero(solvable):
+                estimates[i] = self.grid_search(positions[i][mask[i]], arrivals[i][mask[i]])
+            points[solvable] = self.to_local_plane(origin, estimates[:, None, :])[0][solvable, 0]
+        elif self.initializer == 'closed_form' or self.solver == 'closed_form':
+            estimate, rms, condition = self.closed_form_local(sensors, measured, weights, ref)
+            seeded = solvable & np.isfinite(estimate).all(axis=1)
+            points[seeded] = estimate[seeded]
+            if self.solver == 'closed_form':
+                # İyi koşullu olaylar için kapalı form çözüm nihai sonuçtur
+                converged = seeded & (condition < self.max_condition) & (rms < self.closed_form_tolerance)
+        
+        residual, units = residuals(rows, points)
+        cost = np.sum(residual ** 2, axis=1)
+        active = np.flatnonzero(solvable & ~converged)
+        diagonal = (slice(None), [0, 1], [0, 1])
+        
+        # Her iterasyonda yalnızca henüz bitmemiş olaylar üzerinde çalış
+        for _ in range(self.max_iterations):
+            if len(active) == 0:
+                break
+            
+            local_rows = np.arange(len(active))
+            active_units = units[active]
+            ref_units = active_units[local_rows, ref[active]][:, None, :]
+            jacobian = (active_units - ref_units) * weights[active][..., None]
+            jtj = np.einsum('esi,esj->eij', jacobian, jacobian)
+            gradient = np.einsum('esi,es->ei', jacobian, residual[active])
+            
+            damped = jtj.copy()
+            damped[diagonal] += damping[active][:, None] * (jtj[diagonal] + 1e-12)
+            step = -np.linalg.solve(damped, gradient[..., None])[..., 0]
+            
+            candidate = points[active] + step
+            candidate_residual, candidate_units = residuals(active, candidate)
+            candidate_cost = np.sum(candidate_residual ** 2, axis=1)
+            
+            improved = candidate_cost < cost[active]
+            accepted = active[improved]
+            points[accepted] = candidate[improved]
+            residual[accepted] = candidate_residual[improved]
+            units[accepted] = candidate_units[improved]
+            cost[accepted] = candidate_cost[improved]
+            damping[active] = np.where(improved, np.maximum(damping[active] / 10.0, 1e-9),
+                                       damping[active] * 10.0)
+            
+            finished = improved & (np.hypot(step[:, 0], step[:, 1]) < self.tolerance)
+            # Daha fazla iyileşme yok: yerel minimumdayız
+            stalled = ~improved & (damping[active] > 1e9)
+            flat = np.hypot(gradient[:, 0], gradient[:, 1]) < 1e-6 * np.maximum(cost[active], 1.0)
+            converged[active] = finished | (stalled & flat)
+            active = active[~(finished | stalled)]
+        
+        converged &= np.isfinite(points).all(axis=1)
+        lonlat = points / scale + origin[:, ::-1]
+        locations = np.where(converged[:, None], lonlat[:, ::-1], np.nan)
+        return locations, converged
+
+    def closed_form_location(self, sensor_positions, time_differences):
+        """
+        Kapalı form (küresel kesişim) TDOA çözümünü GPS koordinatlarında hesapla
+        
+        Args:
+            sensor_positions: Sensörlerin GPS koordinatları [(lat1,lon1), ...]
+            time_differences: Her sensörün ortak bir referansa göre varış zamanı [t1, t2, ...]
+        
+        Returns:
+            (np.array([lat, lon]), artık RMS (metre), koşul sayısı)
+        """
+        positions = np.asarray(sensor_positions, dtype=float)
+        arrivals = np.asarray(time_differences, dtype=float)
+        origin = positions.mean(axis=0)
+        sensors, scale = self.to_local_plane(origin, positions)
+        
+        weights = np.ones((1, len(sensors)))
+        weights[0, 0] = 0.0
+        measured = (arrivals - arrivals[0]) * self.sound_speed
+        estimate, rms, condition = self.closed_form_local(
+            sensors[None], measured[None], weights, np.zeros(1, dtype=int)
+        )
+        lon, lat = estimate[0] / scale + np.array([origin[1], origin[0]])
+        return np.array([lat, lon]), rms[0], condition[0]
+    
+    def closed_form_local(self, sensors, measured, weights, ref):
+        """
+        Yerel düzlemde küresel kesişim (Chan tipi) en küçük kareler TDOA çözümü
+        
+        Referans sensör orijine taşındığında her sensör için
+        2 s_i·x + 2 d_i r_0 = |s_i|^2 - d_i^2 doğrusal denklemi elde edilir
+        (d_i: ölçülen mesafe farkı, r_0: kaynağın referansa uzaklığı). x, r_0
+        cinsinden en küçük kareler ile çözülür ve |x| = r_0 kısıtı ikinci
+        derece denklem olarak uygulanır; 3 sensörle de çalışır.
+        
+        Args:
+            sensors: (E, S, 2) yerel düzlem koordinatları (metre)
+            measured: (E, S) referans sensöre göre mesafe farkları (metre)
+            weights: (E, S) 1/0 ağırlıkları; referans ve boş yuvalar 0
+            ref: (E,) referans sensör indeksleri
+        
+        Returns:
+            (E, 2) noktalar, (E,) artık RMS (metre) ve (E,) koşul sayıları
+        """
+        rows = np.arange(len(sensors))
+        reference = sensors[rows, ref][:, None, :]
+        shifted = (sensors - reference) * weights[..., None]
+        
+        a = 2.0 * shifted
+        b = (np.sum(shifted ** 2, axis=-1) - measured ** 2) * weights
+        g = 2.0 * measured * weights
+        
+        ata = np.einsum('esi,esj->eij', a, a)
+        condition = np.linalg.cond(ata)
+        ata = ata + 1e-9 * np.eye(2)
+        # x = p + q r_0
+        p = np.linalg.solve(ata, np.einsum('esi,es->ei', a, b)[..., None])[..., 0]
+        q = -np.linalg.solve(ata, np.einsum('esi,es->ei', a, g)[..., None])[..., 0]
+        
+        # |p + q r_0|^2 = r_0^2  ->  c2 r_0^2 + c1 r_0 + c0 = 0
+        c2 = np.sum(q * q, axis=1) - 1.0
+        c1 = 2.0 * np.sum(p * q, axis=1)
+        c0 = np.sum(p * p, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            root = np.sqrt(np.maximum(c1 ** 2 - 4.0 * c2 * c0, 0.0))
+            linear = np.abs(c2) < 1e-12
+            candidates = np.stack([
+                np.where(linear, -c0 / c1, (-c1 + root) / (2.0 * c2)),
+                np.where(linear, -c0 / c1, (-c1 - root) / (2.0 * c2)),
+            ], axis=1)
+        
+        # Geçerli (r_0 >= 0) kökler arasından TDOA artığı en küçük olanı seç
+        points = p[:, None, :] + q[:, None, :] * candidates[..., None]
+        ranges = np.hypot(*np.moveaxis(points[:, :, None, :] - shifted[:, None, :, :], -1, 0))
+        ranges_ref = np.hypot(points[..., 0], points[..., 1])[..., None]
+        residual = (ranges - ranges_ref - measured[:, None, :]) * weights[:, None, :]
+        cost = np.sum(residual ** 2, axis=-1)
+        cost = np.where((candidates >= 0) & np.isfinite(cost), cost, np.inf)
+        best = np.argmin(cost, axis=1)
+        
+        count = np.maximum(weights.sum(axis=1), 1.0)
+        rms = np.sqrt(cost[rows, best] / count)
+        estimate = points[rows, best] + reference[:, 0, :]
+        estimate[~np.isfinite(rms)] = np.nan
+        return estimate, rms, condition
+
+    def grid_search(self, sensor_positions, time_differences):
+        """
+        Önbellekteki varış zamanı ızgarası üzerinde vektörel kaba arama yap
+        
+        Her hücre için bilinmeyen atış anı, tahmini ve ölçülen varış
+        zamanları farkının ortalamasıyla elenir; artık varyansı en küçük
+        hücre döndürülür. Sonuç yerel minimumlardan etkilenmez ve süresi
+        yalnızca ızgara boyutuna bağlıdır.
+        
+        Args:
+            sensor_positions: Sensörlerin GPS koordinatları [(lat1,lon1), ...]
+            time_differences: Her sensörün ortak bir referansa göre varış zamanı [t1, t2, ...]
+        
+        Returns:
+            np.array([lat, lon]) en iyi hücrenin merkezi
+        """
+        if self.grid_cache is None:
+            self.grid_cache = TravelTimeGridCache()
+        positions = np.asarray(sensor_positions, dtype=float)
+        arrivals = np.asarray(time_differences, dtype=float)
+        keys = geometry_keys(positions)
+        
+        entry, rows = self.grid_cache.find(keys)
+        if entry is None:
+            entry = self.build_travel_time_grid(positions)
+            rows = [entry['rows'][key] for key in keys]
+            self.grid_cache.put(keys, entry)
+        
+        offsets = entry['times'][rows] - arrivals[:, None].astype(np.float32)
+        offsets -= offsets.mean(axis=0)
+        best = np.argmin(np.einsum('sc,sc->c', offsets, offsets))
+        
+        axis = entry['axis']
+        x, y = axis[best % len(axis)], axis[best // len(axis)]
+        lon, lat = np.array([x, y]) / entry['scale'] + entry['origin'][::-1]
+        return np.array([lat, lon])
+    
+    def precompute_grid(self, sensor_positions):
+        """
+        Tüm sensör dizisi için ızgarayı önceden hesapla; dizinin alt kümelerini
+        içeren olaylar da bu ızgarayı kullanır
+        
+        Args:
+            sensor_positions: Dizideki tüm sensörlerin GPS koordinatları [(lat1,lon1), ...]
+        """
+        if self.grid_cache is None:
+            self.grid_cache = TravelTimeGridCache()
+        keys = geometry_keys(sensor_positions)
+        entry, _ = self.grid_cache.find(keys)
+        if entry is None:
+            self.grid_cache.put(keys, self.build_travel_time_grid(sensor_positions))
+    
+    def build_travel_time_grid(self, sensor_positions):
+        """
+        Sensör dizisi etrafındaki yerel kare ızgarada her sensöre varış sürelerini hesapla
+        
+        Args:
+            sensor_positions: Sensörlerin GPS koordinatları [(lat1,lon1), ...]
+        
+        Returns:
+            dict: origin, scale, axis (metre), rows ({konum anahtarı: satır})
+            ve times ((S, H*W) float32 varış süreleri)
+        """
+        cache = self.grid_cache
+        positions = np.asarray(sensor_positions, dtype=float)
+        origin = positions.mean(axis=0)
+        sensors, scale = self.to_local_plane(origin, positions)
+        
+        # Dizi yarıçapı + kenar payı; hücre sayısı sınırı aşılırsa çözünürlük düşürülür
+        half_width = np.max(np.hypot(sensors[:, 0], sensors[:, 1])) + cache.margin
+        resolution = max(cache.resolution, 2.0 * half_width / cache.max_cells_per_side)
+        axis = np.arange(-half_width, half_width + resolution, resolution)
+        grid_x, grid_y = np.meshgrid(axis, axis)
+        cells = np.stack([grid_x.ravel(), grid_y.ravel()], axis=1)
+        
+        times = np.empty((len(sensors), len(cells)), dtype=np.float32)
+        for i, sensor in enumerate(sensors):
+            times[i] = np.hypot(cells[:, 0] - sensor[0], cells[:, 1] - sensor[1]) / self.sound_speed
+        
+        return {
+            'origin': origin,
+            'scale': scale,
+            'axis': axis,
+            'rows': {key: i for i, key in enumerate(geometry_keys(positions))},
+            'times': times,
+        }
+
+class TravelTimeGridCache:
+    def __init__(self, resolution=10.0, margin=500.0, max_cells_per_side=256,
+                 max_bytes=64 * 1024 * 1024, max_entries=16):
+        """
+        Sensör geometrisine göre anahtarlanan, bellek sınırlı (LRU) varış zamanı ızgarası önbelleği
+        
+        Args:
+            resolution: Hedef hücre boyutu (metre)
+            margin: Sensör dizisinin dışına taşan arama alanı (metre)
+            max_cells_per_side: Izgaranın bir kenarındaki en fazla hücre sayısı
+            max_bytes: Önbellekteki ızgaraların toplam bellek sınırı (bayt)
+            max_entries: Önbellekteki en fazla ızgara sayısı
+        """
+        self.resolution = resolution
+        self.margin = margin
+        self.max_cells_per_side = max_cells_per_side
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def find(self, keys):
+        """
+        Verilen sensörlerin tamamını içeren bir ızgara ara
+        
+        Args:
+            keys: geometry_keys() ile üretilmiş sensör konum anahtarları
+        
+        Returns:
+            (entry, rows): ızgara ve sensörlerin ızgaradaki satırları; yoksa (None, None)
+        """
+        with self.lock:
+            entry = self.entries.get(frozenset(keys))
+            if entry is None:
+                # Olaya katılan sensörler daha büyük bir dizinin alt kümesi olabilir
+                entry = next((e for e in reversed(self.entries.values())
+                              if all(key in e['rows'] for key in keys)), None)
+            if entry is None:
+                return None, None
+            self.entries.move_to_end(frozenset(entry['rows']))
+            return entry, [entry['rows'][key] for key in keys]
+    
+    def put(self, keys, entry):
+        """Izgarayı ekle ve sınırlar aşılırsa en eski ızgaraları çıkar"""
+        size = entry['times'].nbytes
+        if size > self.max_bytes:
+            return False
+        with self.lock:
+            key = frozenset(keys)
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)['times'].nbytes
+            self.entries[key] = entry
+            self.nbytes += size
+            while self.nbytes > self.max_bytes or len(self.entries) > self.max_entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted['times'].nbytes
+        return True
+    
+    def invalidate(self, sensor_positions=None):
+        """
+        Konumu değişen sensörleri içeren ızgaraları çıkar
+        
+        Args:
+            sensor_positions: Eski sensör konumları [(lat, lon), ...]; verilmezse tüm önbellek temizlenir
+        """
+        with self.lock:
+            if sensor_positions is None:
+                self.entries.clear()
+                self.nbytes = 0
+                return
+            moved = set(geometry_keys(sensor_positions))
+            for key in [key for key in self.entries if key & moved]:
+                self.nbytes -= self.entries.pop(key)['times'].nbytes
+
+def geometry_keys(sensor_positions):
+    """Sensör konumlarını ~0.1 m hassasiyetle önbellek anahtarlarına dönüştür"""
+    return [(round(float(lat), 6), round(float(lon), 6)) for lat, lon in sensor_positions]
+
+# Sunucu tarafının kullandığı varsayılan hesaplayıcı
+_default_calculator = TriangulationCalculator(solver='lm')
+
+def calculate_source_location(sensor_positions, time_differences):
+    """
+    Varsayılan (yerel düzlem, Levenberg-Marquardt) çözücü ile kaynak konumunu hesapla
+    
+    Args:
+        sensor_positions: Sensörlerin GPS koordinatları [(lat1,lon1), ...]
+        time_differences: Her sensörün en erken varışa göre zaman farkı [t1, t2, ...]
+    """
+    return _default_calculator.calculate_source_location(sensor_positions, time_differences)
+
+
+def stack_events(events):
+    """
+    Farklı sayıda sensör içeren olayları toplu çözücü için NaN ile doldurulmuş dizilere dönüştür
+    
+    Args:
+        events: [(sensor_positions, time_differences), ...]
+    
+    Returns:
+        (E, S, 2) sensör konumları ve (E, S) zaman farkları
+    """
+    width = max((len(positions) for positions, _ in events), default=0)
+    sensor_positions = np.full((len(events), width, 2), np.nan)
+    time_differences = np.full((len(events), width), np.nan)
+    for i, (positions, arrivals) in enumerate(events):
+        sensor_positions[i, :len(positions)] = positions
+        time_differences[i, :len(arrivals)] = arrivals
+    return sensor_positions, time_differences
\ No newline at end of file